@@ -0,0 +1,165 @@
+"""
+Bytes on the wire and end to end latency of a verbose block with and without
+response compression, against a local stand-in server whose writes are
+throttled to a given bandwidth.
+
+    python benchmark/compression.py [mbit] [runs] [txs]
+
+mbit: link bandwidth in Mbit/s (default 20), txs: transactions in the block
+The stand-in compresses with whatever the client's Accept-Encoding prefers
+(zstd, br, gzip, deflate), like a compressing proxy in front of hsd.
+"""
+import os
+import sys
+import gzip
+import json
+import time
+import zlib
+import hashlib
+import statistics
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from handshake_client.compression import _brotli, _zstd  # noqa: E402
+from handshake_client.http_ import HttpClient  # noqa: E402
+from handshake_client.rpc import RpcClient  # noqa: E402
+
+
+def fake_block(txs: int) -> dict:
+    """
+    verbose getblock shaped json, hashes are random so only the structure
+    and the hex encoding compress
+    """
+
+    def h(*parts: object) -> str:
+        return hashlib.sha256(repr(parts).encode()).hexdigest()
+
+    return {
+        "hash": h("block"),
+        "height": 100000,
+        "tx": [
+            {
+                "txid": h(i),
+                "hash": h(i, "w"),
+                "version": 0,
+                "locktime": 0,
+                "vin": [
+                    {
+                        "txid": h(i, j, "in"),
+                        "vout": j,
+                        "txinwitness": [h(i, j, "sig") * 2, h(i, j, "key")[:66]],
+                        "sequence": 4294967295,
+                    }
+                    for j in range(2)
+                ],
+                "vout": [
+                    {
+                        "value": 1.5 + j,
+                        "n": j,
+                        "address": {
+                            "version": 0,
+                            "hash": h(i, j, "addr")[:40],
+                        },
+                        "covenant": {"type": 0, "action": "NONE", "items": []},
+                    }
+                    for j in range(2)
+                ],
+            }
+            for i in range(txs)
+        ],
+    }
+
+
+def compress(body: bytes, accept: str):
+    offered = [part.split(";")[0].strip() for part in accept.split(",")]
+    for encoding in offered:
+        if encoding == "zstd" and _zstd() is not None:
+            return encoding, _zstd().ZstdCompressor().compress(body)
+        if encoding == "br" and _brotli() is not None:
+            return encoding, _brotli().compress(body, quality=5)
+        if encoding == "gzip":
+            return encoding, gzip.compress(body, 6)
+        if encoding == "deflate":
+            return encoding, zlib.compress(body, 6)
+    return None, body
+
+
+class StandIn(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    body = b""
+    bytes_per_second = 0.0
+    sent = 0
+    lock = threading.Lock()
+
+    def log_message(self, *args: object) -> None:
+        pass
+
+    def _reply(self, body: bytes) -> None:
+        encoding, payload = compress(body, self.headers.get("Accept-Encoding", ""))
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        if encoding:
+            self.send_header("Content-Encoding", encoding)
+        self.end_headers()
+        chunk = 16 * 1024
+        for i in range(0, len(payload), chunk):
+            self.wfile.write(payload[i : i + chunk])
+            time.sleep(len(payload[i : i + chunk]) / self.bytes_per_second)
+        with self.lock:
+            StandIn.sent += len(payload)
+
+    def do_GET(self) -> None:
+        self._reply(self.body)
+
+    def do_POST(self) -> None:
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        result = b'{"result": ' + self.body + b', "error": null, "id": 1}'
+        self._reply(result)
+
+
+def measure(call, runs: int):
+    StandIn.sent = 0
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        r = call()
+        times.append(time.perf_counter() - start)
+        assert isinstance(r, dict) and "error" not in r, r
+    return StandIn.sent / runs, statistics.median(times)
+
+
+def main() -> int:
+    mbit = float(sys.argv[1]) if len(sys.argv) > 1 else 20.0
+    runs = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    txs = int(sys.argv[3]) if len(sys.argv) > 3 else 2000
+    StandIn.body = json.dumps(fake_block(txs)).encode()
+    StandIn.bytes_per_second = mbit * 1e6 / 8
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandIn)
+    port = server.server_address[1]
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    print(f"block json {len(StandIn.body) / 1e6:.2f} MB, link {mbit} Mbit/s")
+    cases = []
+    for compression in (False, True):
+        node = HttpClient("x", "127.0.0.1", str(port), compression=compression)
+        cases.append((f"rest compression={compression}", node.get_info))
+    for compression in (False, True):
+        rpc = RpcClient("x", "127.0.0.1", str(port), compression=compression)
+        call = lambda c=rpc: c.rpc_call("getblock", "00", 1, 1)  # noqa: E731
+        cases.append((f"rpc compression={compression}", call))
+    for name, call in cases:
+        try:
+            wire, latency = measure(call, runs)
+        except ImportError as e:
+            print(f"{name:28} skipped ({e})")
+            continue
+        print(f"{name:28} {wire / 1e3:10.1f} kB on wire {latency * 1000:10.1f} ms")
+    server.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,71 @@
+"""
+Import time of handshake_client in a fresh interpreter.
+
+    python benchmark/import_time.py [budget_ms]
+
+Fails when an import takes longer than the budget (median of a few runs) or
+when a heavy dependency gets loaded by the import alone.
+"""
+import os
+import sys
+import json
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY = ["requests", "bitcoinrpc", "socketio", "aiohttp", "asyncio"]
+CASES = {
+    "import handshake_client": "import handshake_client",
+    "from handshake_client import RpcClient": (
+        "from handshake_client import RpcClient"
+    ),
+    "import handshake_client.http_": "import handshake_client.http_",
+    "import handshake_client.sockets": "import handshake_client.sockets",
+}
+RUNS = 7
+
+PROBE = """
+import sys, time, json
+start = time.perf_counter()
+{statement}
+elapsed = time.perf_counter() - start
+heavy = [m for m in {heavy!r} if m in sys.modules]
+print(json.dumps({{"ms": elapsed * 1000, "heavy": heavy}}))
+"""
+
+
+def measure(statement: str) -> dict:
+    code = PROBE.format(statement=statement, heavy=HEAVY)
+    env = dict(os.environ, PYTHONPATH=ROOT, PYTHONDONTWRITEBYTECODE="1")
+    results = []
+    for _ in range(RUNS):
+        out = subprocess.run(
+            [sys.executable, "-c", code],
+            env=env,
+            cwd=ROOT,
+            check=True,
+            stdout=subprocess.PIPE,
+        ).stdout
+        results.append(json.loads(out))
+    return {
+        "ms": statistics.median(r["ms"] for r in results),
+        "heavy": results[0]["heavy"],
+    }
+
+
+def main() -> int:
+    budget = float(sys.argv[1]) if len(sys.argv) > 1 else 50.0
+    failed = False
+    for name, statement in CASES.items():
+        r = measure(statement)
+        ok = r["ms"] <= budget and not r["heavy"]
+        failed = failed or not ok
+        heavy = ", ".join(r["heavy"]) or "-"
+        status = "ok" if ok else "FAIL"
+        print(f"{status:4} {r['ms']:7.1f} ms  heavy: {heavy:20}  {name}")
+    print(f"budget {budget:.1f} ms")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
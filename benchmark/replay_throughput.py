@@ -0,0 +1,53 @@
+"""
+Replay the rpc and http calls of a transport.Recorder file through the clients
+and report the throughput, without a node.
+
+    python benchmark/replay_throughput.py session.jsonl.gz [speed] [workers]
+
+speed: 1.0 keeps the recorded latency, 0 answers immediately (client overhead)
+"""
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from handshake_client.http_ import Request  # noqa: E402
+from handshake_client.rpc import RpcClient  # noqa: E402
+from handshake_client.transport import Replayer, _decode  # noqa: E402
+
+
+def main() -> int:
+    path = sys.argv[1]
+    speed = float(sys.argv[2]) if len(sys.argv) > 2 else 1.0
+    workers = int(sys.argv[3]) if len(sys.argv) > 3 else 8
+    replayer = Replayer(path, speed)
+    calls = []
+    for entry in replayer.entries:
+        port, _, base = entry.get("b", "").lstrip(":").partition("/")
+        if entry["k"] == "rpc":
+            client = RpcClient("x", "replay", port or "0", transport=replayer)
+            args = _decode(entry["a"])
+            calls.append(lambda c=client, n=entry["n"], a=args: c.rpc_call(n, *a))
+        elif entry["k"] == "http":
+            endpoint = f"http://replay:{port or 0}" + (f"/{base}" if base else "")
+            request = Request(endpoint, transport=replayer)
+            method, _, target = entry["n"].partition(" ")
+            params = _decode(entry["a"])
+            calls.append(
+                lambda r=request, m=method, t=target, p=params: r.try_request(m, t, p)
+            )
+    if not calls:
+        print("no rpc/http calls in the recording")
+        return 1
+    start = time.perf_counter()
+    with ThreadPoolExecutor(workers) as executor:
+        list(executor.map(lambda call: call(), calls))
+    elapsed = time.perf_counter() - start
+    print(f"{len(calls)} calls in {elapsed:.3f} s, {len(calls) / elapsed:.1f} calls/s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,40 @@
+"""
+REST and RPC clients for handshake.
+Names below are imported from their submodule on first access (PEP 562), so
+`from handshake_client import RpcClient` does not load requests or socketio.
+"""
+import importlib
+from typing import Any, List
+
+_LAZY = {
+    "HttpClient": "http_",
+    "WalletHttpClient": "http_",
+    "WalletAdminCommand": "http_",
+    "RpcClient": "rpc",
+    "WalletRpcClient": "rpc",
+    "get_connection": "sockets",
+    "get_wallet_connection": "sockets",
+    "ChainEntry": "chain",
+    "HandshakeError": "errors",
+    "VerifyError": "errors",
+    "MultiWalletClient": "wallets",
+    "Block": "primitives",
+    "BlockHeader": "primitives",
+    "Transaction": "primitives",
+}
+
+__all__ = sorted(_LAZY)
+
+
+def __getattr__(name: str) -> Any:
+    module = _LAZY.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f"{__name__}.{module}"), name)
+    # cache it, later lookups do not go through __getattr__
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> List[str]:
+    return sorted(list(globals()) + __all__)
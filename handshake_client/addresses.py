@@ -0,0 +1,213 @@
+import os
+import json
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+from handshake_client.errors import HandshakeError, unwrap
+from handshake_client.http_ import WalletHttpClient
+from handshake_client.rpc import WalletRpcClient
+
+
+logger = logging.getLogger("handshake.addresses")
+
+
+class AddressPool:
+    """
+    Receive addresses derived ahead of time and handed out from memory.
+    A background thread tops every account up to size once it falls to
+    low_watermark, deriving with max_workers concurrent wallet calls
+    (or getnewaddress batches with a WalletRpcClient).
+
+    State survives restarts without ever handing out an address twice:
+    state_path holds the derived, not yet handed out addresses and every
+    address handed out is appended to state_path + ".log" before get()
+    returns it. The log is folded into the snapshot at each refill.
+
+    NOTE: addresses waiting in the pool are gaps to the wallet, keep size
+    below the wallet lookahead (200 in hsd) or a rescan from the seed can
+    miss deposits to addresses handed out later.
+
+        pool = AddressPool(wallet, "addresses.json", accounts=["default"])
+        pool.start()
+        address = pool.get("default")
+    """
+
+    def __init__(
+        self,
+        wallet: Union[WalletHttpClient, WalletRpcClient],
+        state_path: str,
+        accounts: Iterable[str] = ("default",),
+        size: int = 100,
+        low_watermark: int = 25,
+        max_workers: int = 8,
+        durable: bool = True,
+    ):
+        """
+        durable: fsync the log on every get(), False only survives process
+                 crashes, not power loss
+        """
+        assert type(state_path) == str
+        assert type(size) == int and size > 0
+        assert type(low_watermark) == int and 0 <= low_watermark < size
+        assert type(max_workers) == int and max_workers > 0
+        self.wallet = wallet
+        self.state_path = state_path
+        self.log_path = state_path + ".log"
+        self.size = size
+        self.low_watermark = low_watermark
+        self.max_workers = max_workers
+        self.durable = durable
+        self.lock = threading.Lock()
+        self.refill_lock = threading.Lock()
+        self.wanted = threading.Event()
+        self.stop_event = threading.Event()
+        self.ready: Dict[str, List[str]] = {account: [] for account in accounts}
+        self._load()
+        self.log = open(self.log_path, "a")
+
+    def _load(self) -> None:
+        if os.path.exists(self.state_path):
+            with open(self.state_path) as f:
+                for account, addresses in json.load(f).items():
+                    self.ready.setdefault(account, []).extend(addresses)
+        if os.path.exists(self.log_path):
+            handed = set()
+            with open(self.log_path) as f:
+                for line in f:
+                    handed.add(tuple(line.rstrip("\n").split(" ", 1)))
+            for account, addresses in self.ready.items():
+                self.ready[account] = [
+                    a for a in addresses if (account, a) not in handed
+                ]
+
+    def get(self, account: str = "default") -> str:
+        """
+        an address never handed out before, derived directly when the pool
+        of account is empty
+        """
+        assert type(account) == str
+        with self.lock:
+            ready = self.ready.setdefault(account, [])
+            address = ready.pop(0) if ready else None
+            if address is not None:
+                # recorded before anyone sees it
+                self.log.write(f"{account} {address}\n")
+                self.log.flush()
+                if self.durable:
+                    os.fsync(self.log.fileno())
+            low = len(ready) <= self.low_watermark
+        if low:
+            self.wanted.set()
+        if address is None:
+            logger.warning(f"address pool of {account} is empty")
+            address = self._derive_one(account)
+        return address
+
+    def available(self, account: str = "default") -> int:
+        return len(self.ready.get(account, []))
+
+    def refill(self) -> int:
+        """
+        top up every account at or below the low watermark, returns the number
+        of derived addresses
+        """
+        with self.refill_lock:
+            derived: Dict[str, List[str]] = {}
+            for account in list(self.ready):
+                missing = self.size - self.available(account)
+                if self.available(account) > self.low_watermark or missing <= 0:
+                    continue
+                try:
+                    addresses, errors = self._derive(account, missing)
+                except Exception as e:
+                    logger.warning(f"address pool refill of {account} failed: {e}")
+                    continue
+                if errors:
+                    logger.warning(
+                        f"address pool refill of {account}: {len(errors)} of "
+                        f"{missing} failed, first error: {errors[0]}"
+                    )
+                if addresses:
+                    derived[account] = addresses
+            if derived:
+                with self.lock:
+                    for account, addresses in derived.items():
+                        self.ready[account].extend(addresses)
+                    self._save()
+            return sum(len(addresses) for addresses in derived.values())
+
+    def _derive_one(self, account: str) -> str:
+        if isinstance(self.wallet, WalletRpcClient):
+            return unwrap(self.wallet.getnewaddress(account))
+        return unwrap(self.wallet.generate_receive_address(account))["address"]
+
+    def _derive(self, account: str, count: int) -> Tuple[List[str], List[str]]:
+        """
+        (derived addresses, errors of the calls that failed), a failed call
+        does not lose the addresses the others derived
+        """
+        addresses: List[str] = []
+        errors: List[str] = []
+        if isinstance(self.wallet, WalletRpcClient):
+            for r in self.wallet.getnewaddresses(count, account):
+                try:
+                    addresses.append(unwrap(r))
+                except HandshakeError as e:
+                    errors.append(str(e))
+            return addresses, errors
+        with ThreadPoolExecutor(min(self.max_workers, count)) as executor:
+            futures = [
+                executor.submit(self._derive_one, account) for _ in range(count)
+            ]
+        for future in futures:
+            try:
+                addresses.append(future.result())
+            except Exception as e:
+                errors.append(str(e))
+        return addresses, errors
+
+    def _save(self) -> None:
+        """
+        snapshot of the pools, the handed out addresses in the log are no longer
+        in it so the log starts over. Called with self.lock held.
+        """
+        tmp = self.state_path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.ready, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.state_path)
+        self.log.truncate(0)
+        self.log.seek(0)
+
+    def start(self, interval: float = 60.0) -> threading.Thread:
+        """
+        refill in a daemon thread, when get() hits the low watermark and at
+        least every interval seconds
+        """
+
+        def run() -> None:
+            while not self.stop_event.is_set():
+                self.refill()
+                self.wanted.wait(interval)
+                self.wanted.clear()
+
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        return thread
+
+    def stop(self) -> None:
+        self.stop_event.set()
+        self.wanted.set()
+
+    def close(self) -> None:
+        self.stop()
+        with self.lock:
+            self.log.close()
+
+    def __enter__(self) -> "AddressPool":
+        return self
+
+    def __exit__(self, *exc: Optional[BaseException]) -> None:
+        self.close()
@@ -0,0 +1,279 @@
+import os
+import json
+import asyncio
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+from handshake_client.chain import ChainEntry
+from handshake_client.errors import is_error
+from handshake_client.http_ import WalletHttpClient
+from handshake_client.rpc import RpcClient
+from handshake_client.urkel import hash_name
+
+
+logger = logging.getLogger("handshake.auction")
+
+PENDING = "pending"
+DONE = "done"
+
+# name state (getnameinfo info.state) -> action to run in that phase
+PHASE_ACTIONS = {
+    None: "open",
+    "BIDDING": "bid",
+    "REVEAL": "reveal",
+    "CLOSED": "redeem",
+}
+# action that has to be done before
+REQUIRES = {"open": None, "bid": None, "reveal": "bid", "redeem": "reveal"}
+
+
+class AuctionEngine:
+    """
+    Run open/bid/reveal/redeem for many names.
+    On every tick (new block) the phase of each name is read with getnameinfo and
+    the action for that phase is sent, names are processed concurrently.
+    Every action is written to the state file as pending before it is sent and
+    as done after, so a restart never sends the same bid twice: a pending action
+    is checked against the wallet before anything is resent.
+    """
+
+    def __init__(
+        self,
+        wallet: WalletHttpClient,
+        node: RpcClient,
+        state_path: str,
+        passphrase: Optional[str] = None,
+        max_workers: int = 8,
+        min_interval: float = 0.0,
+        max_attempts: int = 3,
+    ):
+        """
+        min_interval: minimum seconds between two wallet calls (rate limit)
+        max_attempts: failed actions are retried on the next ticks up to this count
+        """
+        assert type(state_path) == str
+        assert passphrase is None or type(passphrase) == str
+        assert type(max_workers) == int
+        assert type(max_attempts) == int
+        self.wallet = wallet
+        self.node = node
+        self.state_path = state_path
+        self.passphrase = passphrase
+        self.min_interval = min_interval
+        self.max_attempts = max_attempts
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.lock = threading.Lock()
+        self.rate_lock = threading.Lock()
+        # one tick at a time, a second one would take the first one's in
+        # flight actions for pending ones left by a crash
+        self.tick_lock = threading.Lock()
+        self.last_call = 0.0
+        self.names: Dict[str, Dict[str, Any]] = {}
+        if os.path.exists(state_path):
+            with open(state_path) as f:
+                self.names = json.load(f)
+
+    def add(self, name: str, bid: int, lockup: int) -> None:
+        """
+        bid, lockup: value in dollarydoos, see WalletHttpClient.send_bid
+        """
+        assert type(name) == str
+        assert type(bid) == int
+        assert type(lockup) == int
+        with self.lock:
+            if name not in self.names:
+                self.names[name] = {"bid": bid, "lockup": lockup, "actions": {}}
+                self._save()
+
+    def status(self, name: str) -> Optional[Dict[str, Any]]:
+        return self.names.get(name)
+
+    def reset(self, name: str, action: str) -> None:
+        """
+        forget a pending or failed action so it is sent again
+        """
+        with self.lock:
+            self.names[name]["actions"].pop(action, None)
+            self._save()
+
+    def tick(self) -> Dict[str, Optional[str]]:
+        """
+        process every name once, returns name -> action sent (or None)
+        returns {} right away when another tick is still running
+        """
+        if not self.tick_lock.acquire(blocking=False):
+            logger.debug("auction tick skipped, the previous one is running")
+            return {}
+        try:
+            names = list(self.names)
+            results = self.executor.map(self._process, names)
+            return dict(zip(names, results))
+        finally:
+            self.tick_lock.release()
+
+    async def attach(self, sio: Any) -> None:
+        """
+        run tick() on every 'chain connect' of a node socket (sockets.get_connection)
+        """
+
+        async def chain_connect(raw_entry: bytes) -> None:
+            entry = ChainEntry.from_raw(raw_entry)
+            logger.debug(f"auction tick at height {entry.height}")
+            await asyncio.get_event_loop().run_in_executor(None, self.tick)
+
+        sio.on("chain connect", chain_connect)
+
+    def _process(self, name: str) -> Optional[str]:
+        record = self.names[name]
+        info = self._call(self.node.getnameinfo, name)
+        if is_error(info):
+            logger.warning(f"getnameinfo {name}: {info['error']}")
+            return None
+        state = info["info"]["state"] if info.get("info") else None
+        actions = record["actions"]
+        # a pending action from a crash is checked before anything else
+        for action, entry in list(actions.items()):
+            if entry["status"] == PENDING and not self._reconcile(name, action, state):
+                return None
+        action = PHASE_ACTIONS.get(state)
+        if action is None or action in actions:
+            return None
+        required = REQUIRES[action]
+        if required is not None and actions.get(required, {}).get("status") != DONE:
+            return None
+        if action == "redeem" and self._won(name, info):
+            # the winner registers the name, there is no losing bid to redeem
+            self._mark(name, action, {"status": DONE, "tx": None, "won": True})
+            return None
+        attempts = record.get("attempts", {}).get(action, 0)
+        if attempts >= self.max_attempts:
+            return None
+        self._mark(name, action, {"status": PENDING})
+        result = self._send(name, action, record)
+        if is_error(result):
+            logger.warning(f"{action} {name}: {result['error']}")
+            with self.lock:
+                record["actions"].pop(action, None)
+                record.setdefault("attempts", {})[action] = attempts + 1
+                record["error"] = result["error"]
+                self._save()
+            return None
+        self._mark(name, action, {"status": DONE, "tx": result.get("hash")})
+        return action
+
+    def _reconcile(self, name: str, action: str, state: Optional[str]) -> bool:
+        """
+        Decide whether a pending action made it to the wallet before a crash.
+        Returns True when the action is settled (done or dropped for a retry).
+        """
+        done = False
+        if action == "open":
+            # the OPEN is in a block (name has a state), waiting in the wallet
+            # or lost, only a lost one is dropped to be sent again
+            done = state is not None
+            if not done and self._open_unconfirmed(name):
+                return False
+        elif action == "bid":
+            # hsd also lists the other bidders' bids on the name
+            bids = self._call(self.wallet.get_wallet_bids_by_name, name)
+            record = self.names[name]
+            done = not is_error(bids) and any(
+                bid.get("own")
+                and bid.get("value") == record["bid"]
+                and bid.get("lockup") == record["lockup"]
+                for bid in bids
+            )
+        elif action == "reveal":
+            reveals = self._call(self.wallet.get_wallet_reveals_by_name, name)
+            done = not is_error(reveals) and any(r.get("own") for r in reveals)
+        if done:
+            self._mark(name, action, {"status": DONE, "tx": None})
+        else:
+            with self.lock:
+                self.names[name]["actions"].pop(action, None)
+                self._save()
+        return True
+
+    def _won(self, name: str, info: Dict[str, Any]) -> bool:
+        """
+        whether the name's owner is one of our reveals
+        """
+        owner = info["info"].get("owner") or {}
+        reveals = self._call(self.wallet.get_wallet_reveals_by_name, name)
+        if is_error(reveals):
+            return False
+        return any(
+            r.get("own")
+            and r.get("prevout", {}).get("hash") == owner.get("hash")
+            and r.get("prevout", {}).get("index") == owner.get("index")
+            for r in reveals
+        )
+
+    def _open_unconfirmed(self, name: str) -> bool:
+        """
+        whether an OPEN of name is in the wallet's unconfirmed txs, True when
+        that cannot be told so nothing is sent twice
+        """
+        txs = self._call(self.wallet.get_pending_transactions)
+        if is_error(txs):
+            return True
+        name_hash = hash_name(name).hex()
+        for tx in txs:
+            for output in tx.get("outputs", []):
+                covenant = output.get("covenant") or {}
+                items = covenant.get("items") or []
+                if covenant.get("action") == "OPEN" and items[:1] == [name_hash]:
+                    return True
+        return False
+
+    def _send(self, name: str, action: str, record: Dict[str, Any]) -> Dict[str, Any]:
+        wallet = self.wallet
+        if action == "open":
+            return self._call(wallet.send_open, name, True, True, self.passphrase)
+        if action == "bid":
+            return self._call(
+                wallet.send_bid,
+                name,
+                True,
+                True,
+                record["bid"],
+                record["lockup"],
+                self.passphrase,
+            )
+        if action == "reveal":
+            return self._call(wallet.send_reveal, name, True, True, self.passphrase)
+        return self._call(wallet.send_redeem, name, True, True, self.passphrase)
+
+    def _call(self, func: Any, *args: Any) -> Any:
+        if self.min_interval > 0:
+            with self.rate_lock:
+                wait = self.last_call + self.min_interval - time.monotonic()
+                if wait > 0:
+                    time.sleep(wait)
+                self.last_call = time.monotonic()
+        return func(*args)
+
+    def _mark(self, name: str, action: str, entry: Dict[str, Any]) -> None:
+        with self.lock:
+            self.names[name]["actions"][action] = entry
+            self._save()
+
+    def _save(self) -> None:
+        tmp = self.state_path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.names, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.state_path)
+
+    def pending_names(self) -> List[str]:
+        return [
+            name
+            for name, record in self.names.items()
+            if "redeem" not in record["actions"]
+        ]
+
+    def close(self) -> None:
+        self.executor.shutdown()
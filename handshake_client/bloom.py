@@ -0,0 +1,127 @@
+import math
+import struct
+from typing import Iterable
+from handshake_client.primitives import Buffer
+
+
+# see hsd (bfilter) BloomFilter, same as BIP37
+MAX_BLOOM_FILTER_SIZE = 36000
+MAX_HASH_FUNCS = 50
+
+BLOOM_UPDATE_NONE = 0
+BLOOM_UPDATE_ALL = 1
+BLOOM_UPDATE_P2PUBKEY_ONLY = 2
+
+
+def murmur3(data: Buffer, seed: int) -> int:
+    """
+    32 bit murmur3 (x86_32)
+    """
+    c1 = 0xCC9E2D51
+    c2 = 0x1B873593
+    length = len(data)
+    h1 = seed & 0xFFFFFFFF
+    tail = length - (length & 3)
+    for (k1,) in struct.iter_unpack("<I", data[:tail]):
+        k1 = (k1 * c1) & 0xFFFFFFFF
+        k1 = ((k1 << 15) | (k1 >> 17)) & 0xFFFFFFFF
+        k1 = (k1 * c2) & 0xFFFFFFFF
+        h1 ^= k1
+        h1 = ((h1 << 13) | (h1 >> 19)) & 0xFFFFFFFF
+        h1 = (h1 * 5 + 0xE6546B64) & 0xFFFFFFFF
+    k1 = 0
+    rest = length & 3
+    if rest == 3:
+        k1 ^= data[tail + 2] << 16
+    if rest >= 2:
+        k1 ^= data[tail + 1] << 8
+    if rest >= 1:
+        k1 ^= data[tail]
+        k1 = (k1 * c1) & 0xFFFFFFFF
+        k1 = ((k1 << 15) | (k1 >> 17)) & 0xFFFFFFFF
+        k1 = (k1 * c2) & 0xFFFFFFFF
+        h1 ^= k1
+    h1 ^= length
+    h1 ^= h1 >> 16
+    h1 = (h1 * 0x85EBCA6B) & 0xFFFFFFFF
+    h1 ^= h1 >> 13
+    h1 = (h1 * 0xC2B2AE35) & 0xFFFFFFFF
+    h1 ^= h1 >> 16
+    return h1
+
+
+class BloomFilter:
+    """
+    BIP37 style bloom filter.
+    to_raw() is the format hsd expects for the socket 'set filter' call.
+    """
+
+    def __init__(
+        self, size: int, n: int, tweak: int = 0, update: int = BLOOM_UPDATE_NONE
+    ):
+        """
+        size: filter size in bits
+        n: number of hash functions
+        """
+        assert type(size) == int and size > 0
+        assert type(n) == int and n > 0
+        self.filter = bytearray((size + 7) // 8)
+        self.size = len(self.filter) * 8
+        self.n = n
+        self.tweak = tweak & 0xFFFFFFFF
+        self.update = update
+
+    @classmethod
+    def from_rate(
+        cls,
+        items: int,
+        rate: float,
+        tweak: int = 0,
+        update: int = BLOOM_UPDATE_NONE,
+        limit: bool = True,
+    ) -> "BloomFilter":
+        """
+        items: expected number of elements
+        rate: false positive rate
+        limit: clamp to the BIP37 maximum size, which is needed for 'set filter'
+        """
+        assert type(items) == int and items > 0
+        assert 0 < rate < 1
+        size = int(-1 / math.log(2) ** 2 * items * math.log(rate) / 8)
+        if limit:
+            size = min(size, MAX_BLOOM_FILTER_SIZE)
+        size = max(size, 1)
+        n = int(size * 8 / items * math.log(2))
+        n = max(1, min(n, MAX_HASH_FUNCS))
+        return cls(size * 8, n, tweak, update)
+
+    def _positions(self, data: Buffer) -> Iterable[int]:
+        for i in range(self.n):
+            seed = (i * 0xFBA4C795 + self.tweak) & 0xFFFFFFFF
+            yield murmur3(data, seed) % self.size
+
+    def add(self, data: Buffer) -> None:
+        for pos in self._positions(data):
+            self.filter[pos >> 3] |= 1 << (7 & pos)
+
+    def test(self, data: Buffer) -> bool:
+        bits = self.filter
+        for pos in self._positions(data):
+            if not bits[pos >> 3] & (1 << (7 & pos)):
+                return False
+        return True
+
+    def __contains__(self, data: Buffer) -> bool:
+        return self.test(data)
+
+    def to_raw(self) -> bytes:
+        """
+        varbytes filter, u32 n, u32 tweak, u8 update
+        """
+        size = len(self.filter)
+        if size < 0xFD:
+            prefix = bytes([size])
+        else:
+            prefix = b"\xfd" + struct.pack("<H", size)
+        tail = struct.pack("<IIB", self.n, self.tweak, self.update)
+        return prefix + bytes(self.filter) + tail
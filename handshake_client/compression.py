@@ -0,0 +1,127 @@
+import zlib
+from typing import Any, Iterable, List, Optional
+
+
+# read size of streamed response bodies
+CHUNK_SIZE = 64 * 1024
+
+
+def _brotli() -> Any:
+    try:
+        import brotli
+    except ImportError:
+        try:
+            import brotlicffi as brotli  # type: ignore
+        except ImportError:
+            return None
+    return brotli
+
+
+def _zstd() -> Any:
+    try:
+        import zstandard
+    except ImportError:
+        return None
+    return zstandard
+
+
+def available_encodings() -> List[str]:
+    """
+    content codings that can be decoded here, preferred first
+    br and zstd need the brotli (or brotlicffi) and zstandard packages
+    """
+    encodings = []
+    if _zstd() is not None:
+        encodings.append("zstd")
+    if _brotli() is not None:
+        encodings.append("br")
+    return encodings + ["gzip", "deflate"]
+
+
+def accept_encoding(encodings: Optional[List[str]] = None) -> str:
+    """
+    Accept-Encoding header value, with decreasing q values in preference order
+    """
+    if encodings is None:
+        encodings = available_encodings()
+    values = []
+    for i, encoding in enumerate(encodings):
+        q = max(1.0 - i * 0.1, 0.1)
+        values.append(encoding if q == 1.0 else f"{encoding};q={q:.1f}")
+    return ", ".join(values)
+
+
+class Decompressor:
+    """
+    incremental decoder for one content coding
+    """
+
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        self.obj: Any = None
+        if encoding == "gzip" or encoding == "x-gzip":
+            self.obj = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        elif encoding == "deflate":
+            # zlib wrapped as the rfc says, raw deflate is tried on the first
+            # chunk since some servers send that instead
+            self.obj = zlib.decompressobj()
+            self.first = True
+        elif encoding == "br" and _brotli() is not None:
+            self.obj = _brotli().Decompressor()
+        elif encoding == "zstd" and _zstd() is not None:
+            self.obj = _zstd().ZstdDecompressor().decompressobj()
+        else:
+            raise ValueError(f"unsupported content encoding {encoding}")
+
+    def decompress(self, data: bytes) -> bytes:
+        if not data:
+            return b""
+        if self.encoding == "deflate" and self.first:
+            self.first = False
+            try:
+                return self.obj.decompress(data)
+            except zlib.error:
+                self.obj = zlib.decompressobj(-zlib.MAX_WBITS)
+                return self.obj.decompress(data)
+        if self.encoding == "br":
+            process = getattr(self.obj, "process", None)
+            return process(data) if process else self.obj.decompress(data)
+        return self.obj.decompress(data)
+
+    def flush(self) -> bytes:
+        if self.encoding in ("br", "zstd"):
+            return b""
+        return self.obj.flush()
+
+
+def decode_body(chunks: Iterable[bytes], content_encoding: Optional[str]) -> bytes:
+    """
+    body from the raw chunks as they arrive, content_encoding is the
+    Content-Encoding header (codings are undone in reverse order)
+    """
+    encodings = [
+        e.strip().lower()
+        for e in (content_encoding or "").split(",")
+        if e.strip() and e.strip().lower() != "identity"
+    ]
+    decoders = [Decompressor(e) for e in reversed(encodings)]
+    parts = []
+    for chunk in chunks:
+        for decoder in decoders:
+            chunk = decoder.decompress(chunk)
+        parts.append(chunk)
+    tail = b""
+    for decoder in decoders:
+        tail = decoder.decompress(tail) + decoder.flush()
+    parts.append(tail)
+    return b"".join(parts)
+
+
+def read_response(response: Any) -> bytes:
+    """
+    decoded body of a requests response made with stream=True
+    decoding happens here instead of in urllib3 so br and zstd work whenever
+    the packages are installed, whatever the urllib3 version
+    """
+    chunks = response.raw.stream(CHUNK_SIZE, decode_content=False)
+    return decode_body(chunks, response.headers.get("Content-Encoding"))
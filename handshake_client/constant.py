@@ -1,3 +1,33 @@
 TIMEOUT = 30
+# long running admin commands (rescan, backup)
+JOB_TIMEOUT = 60 * 60 * 24
 
 COMMANDS = ["add", "onetry", "remove"]
+
+# covenant types, index is the wire value
+# see https://hsd-dev.org/guides/names.html
+COVENANT_TYPES = [
+    "NONE",
+    "CLAIM",
+    "OPEN",
+    "BID",
+    "REVEAL",
+    "REDEEM",
+    "REGISTER",
+    "UPDATE",
+    "RENEW",
+    "TRANSFER",
+    "FINALIZE",
+    "REVOKE",
+]
+
+# bech32 address prefix
+NETWORK_HRP = {"main": "hs", "testnet": "ts", "regtest": "rs", "simnet": "ss"}
+
+# compact bits of the easiest allowed target (hsd network pow.bits / pow.limit)
+POW_LIMIT_BITS = {
+    "main": 0x1C00FFFF,
+    "testnet": 0x1D00FFFF,
+    "regtest": 0x207FFFFF,
+    "simnet": 0x207FFFFF,
+}
@@ -0,0 +1,296 @@
+import logging
+import sqlite3
+from abc import ABC, abstractmethod
+import threading
+from collections import deque
+from contextlib import contextmanager
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import (
+    Any,
+    Callable,
+    ContextManager,
+    Deque,
+    Iterator,
+    Optional,
+    Tuple,
+    Union,
+)
+from handshake_client.errors import HandshakeError, VerifyError, unwrap
+from handshake_client.rpc import RpcClient
+
+
+logger = logging.getLogger("handshake.consumer")
+
+ZERO_HASH = "00" * 32
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS checkpoints (
+    height INTEGER PRIMARY KEY,
+    hash TEXT NOT NULL
+);
+"""
+
+
+@dataclass()
+class Checkpoint:
+    height: int
+    hash: str
+
+
+class CheckpointStore(ABC):
+    """
+    Where BlockConsumer keeps the hashes of the blocks it connected.
+    add/remove are called inside transaction() together with the callback,
+    a store that can make the callback's writes part of that transaction
+    (like SqliteCheckpointStore) gives exactly once processing.
+    """
+
+    @abstractmethod
+    def transaction(self) -> ContextManager[Any]:
+        """
+        context manager around one block's callback and checkpoint change
+        """
+
+    @abstractmethod
+    def tip(self) -> Optional[Checkpoint]:
+        pass
+
+    @abstractmethod
+    def hash_at(self, height: int) -> Optional[str]:
+        pass
+
+    @abstractmethod
+    def add(self, height: int, block_hash: str) -> None:
+        pass
+
+    @abstractmethod
+    def remove(self, height: int) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+class SqliteCheckpointStore(CheckpointStore):
+    """
+    Checkpoints in a SQLite table. transaction() yields the connection, write
+    the index to self.db from the callbacks and it commits (or rolls back)
+    with the checkpoint.
+    keep: hashes kept below the tip, the deepest reorg that can be rolled back
+    """
+
+    def __init__(self, path: str, keep: int = 1000):
+        assert type(path) == str
+        assert type(keep) == int and keep > 0
+        self.keep = keep
+        self.lock = threading.RLock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.executescript(SCHEMA)
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        with self.lock, self.db:
+            yield self.db
+
+    def tip(self) -> Optional[Checkpoint]:
+        row = self.db.execute(
+            "SELECT height, hash FROM checkpoints ORDER BY height DESC LIMIT 1"
+        ).fetchone()
+        return Checkpoint(row[0], row[1]) if row else None
+
+    def hash_at(self, height: int) -> Optional[str]:
+        query = "SELECT hash FROM checkpoints WHERE height = ?"
+        row = self.db.execute(query, (height,)).fetchone()
+        return row[0] if row else None
+
+    def add(self, height: int, block_hash: str) -> None:
+        self.db.execute(
+            "INSERT OR REPLACE INTO checkpoints (height, hash) VALUES (?, ?)",
+            (height, block_hash),
+        )
+        self.db.execute(
+            "DELETE FROM checkpoints WHERE height < ?", (height - self.keep,)
+        )
+
+    def remove(self, height: int) -> None:
+        self.db.execute("DELETE FROM checkpoints WHERE height = ?", (height,))
+
+    def close(self) -> None:
+        self.db.close()
+
+
+class BlockConsumer:
+    """
+    Feed blocks to on_connect in height order and undo them with on_disconnect
+    on reorgs.
+    The next prefetch blocks are fetched in worker threads while on_connect
+    runs. Each callback commits in one store transaction with its checkpoint,
+    so after a crash sync() continues after the last committed block. A block
+    whose prevBlock is not the stored hash below it means the node reorged:
+    stored blocks are disconnected, newest first, down to the highest one the
+    node still has in its main chain.
+
+        store = SqliteCheckpointStore("index.db")
+
+        def on_connect(block, height):
+            store.db.executemany("INSERT INTO txs VALUES (?, ?)", ...)
+
+        def on_disconnect(block_hash, height):
+            store.db.execute("DELETE FROM txs WHERE height = ?", (height,))
+
+        consumer = BlockConsumer(rpc, store, on_connect, on_disconnect)
+        consumer.run()
+
+    on_connect(block, height): block is a primitives.Block, or the getblock
+        (verbose, details) json with verbose=True
+    on_disconnect(block_hash, height)
+    """
+
+    def __init__(
+        self,
+        client: RpcClient,
+        store: Union[CheckpointStore, str],
+        on_connect: Callable[[Any, int], Any],
+        on_disconnect: Optional[Callable[[str, int], Any]] = None,
+        start_height: int = 0,
+        prefetch: int = 32,
+        workers: int = 8,
+        verbose: bool = False,
+    ):
+        """
+        store: a CheckpointStore, or the path of a SqliteCheckpointStore
+        start_height: first block when the store is empty, trusted as is
+        """
+        assert type(start_height) == int and start_height >= 0
+        assert type(prefetch) == int and prefetch > 0
+        assert type(workers) == int and workers > 0
+        self.client = client
+        self.on_connect = on_connect
+        self.on_disconnect = on_disconnect
+        if isinstance(store, str):
+            store = SqliteCheckpointStore(store)
+        assert isinstance(store, CheckpointStore)
+        self.store = store
+        self.start_height = start_height
+        self.prefetch = prefetch
+        self.verbose = verbose
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.wake = threading.Event()
+        self.stop_event = threading.Event()
+
+    @property
+    def height(self) -> int:
+        """
+        last connected height, start_height - 1 before the first block
+        """
+        tip = self.store.tip()
+        return tip.height if tip else self.start_height - 1
+
+    def sync(self, target: Optional[int] = None) -> int:
+        """
+        connect blocks up to target (default: node tip), returns the height
+        """
+        assert target is None or type(target) == int
+        node_height = unwrap(self.client.getblockcount())
+        if target is None:
+            target = node_height
+        tip = self.store.tip()
+        if tip is not None and (
+            tip.height > node_height
+            or unwrap(self.client.getblockhash(tip.height)) != tip.hash
+        ):
+            # the stored tip left the main chain since the last sync
+            self._rollback()
+        window: Deque[Tuple[int, Future]] = deque()
+        try:
+            next_height = self.height + 1
+            while self.height < target:
+                while next_height <= target and len(window) < self.prefetch:
+                    future = self.executor.submit(self._fetch, next_height)
+                    window.append((next_height, future))
+                    next_height += 1
+                height, future = window.popleft()
+                block_hash, prev_hash, block = future.result()
+                expected = self.store.hash_at(height - 1)
+                if expected is not None and prev_hash != expected:
+                    # prefetched blocks may be from either chain, start over
+                    self._cancel(window)
+                    self._rollback()
+                    next_height = self.height + 1
+                    continue
+                with self.store.transaction():
+                    self.on_connect(block, height)
+                    self.store.add(height, block_hash)
+        finally:
+            self._cancel(window)
+        return self.height
+
+    def _fetch(self, height: int) -> Tuple[str, str, Any]:
+        """
+        (hash, prevBlock, block) of height in the node's main chain
+        """
+        block_hash = unwrap(self.client.getblockhash(height))
+        if self.verbose:
+            block = unwrap(self.client.getblock(block_hash, 1, 1))
+            return block_hash, block.get("previousblockhash") or ZERO_HASH, block
+        block = unwrap(self.client.getblock_raw(block_hash))
+        if block.hash != block_hash:
+            raise VerifyError(f"block hash mismatch {block_hash}")
+        return block_hash, block.header.prevBlock, block
+
+    def _cancel(self, window: Deque[Tuple[int, Future]]) -> None:
+        for _, future in window:
+            future.cancel()
+        window.clear()
+
+    def _rollback(self) -> None:
+        """
+        disconnect stored blocks the node no longer has in its main chain
+        """
+        node_height = unwrap(self.client.getblockcount())
+        height = self.height
+        while height >= self.start_height:
+            stored = self.store.hash_at(height)
+            if stored is None:
+                raise VerifyError("reorg deeper than the stored checkpoints")
+            if height <= node_height:
+                if unwrap(self.client.getblockhash(height)) == stored:
+                    break
+            logger.info(f"reorg: disconnecting block {height} {stored}")
+            with self.store.transaction():
+                if self.on_disconnect is not None:
+                    self.on_disconnect(stored, height)
+                self.store.remove(height)
+            height -= 1
+
+    def notify(self) -> None:
+        """
+        wake run() now, ex. from a 'chain connect' socket handler
+        """
+        self.wake.set()
+
+    def run(self, interval: float = 10.0) -> None:
+        """
+        sync, then again after every notify() or interval seconds, until stop()
+        Node and connection errors are retried, a VerifyError or an exception
+        from the callbacks stops it and is raised.
+        """
+        while not self.stop_event.is_set():
+            try:
+                self.sync()
+            except VerifyError:
+                raise
+            except (HandshakeError, OSError) as e:
+                logger.warning(f"block consumer sync failed: {e}")
+            self.wake.wait(interval)
+            self.wake.clear()
+
+    def stop(self) -> None:
+        self.stop_event.set()
+        self.wake.set()
+
+    def close(self) -> None:
+        self.stop()
+        self.executor.shutdown()
+        self.store.close()
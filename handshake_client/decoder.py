@@ -0,0 +1,151 @@
+import json
+import logging
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Deque, Iterable, Iterator, Optional, Tuple
+from handshake_client.rpc import RpcClient
+
+try:
+    # python 3.8+
+    from multiprocessing import shared_memory
+except ImportError:  # pragma: no cover
+    shared_memory = None  # type: ignore
+
+
+logger = logging.getLogger("handshake.decoder")
+
+# smaller payloads are cheaper to pickle than to put in shared memory
+SHARED_MEMORY_MIN_SIZE = 64 * 1024
+
+
+def _load(raw: bytes, func: Callable[[Any], Any]) -> Any:
+    """
+    json-rpc (or rest) response bytes to func(result), errors in the
+    handshake Errors format are returned as is
+    """
+    data = json.loads(raw)
+    if isinstance(data, dict) and "result" in data and "error" in data:
+        if data["error"]:
+            return {"error": data["error"]}
+        data = data["result"]
+    elif isinstance(data, dict) and data.get("error"):
+        return data
+    return func(data)
+
+
+def _run_bytes(func: Callable[[Any], Any], raw: bytes) -> Any:
+    return _load(raw, func)
+
+
+def _run_shared(func: Callable[[Any], Any], name: str, size: int) -> Any:
+    # the parent unlinks the segment once the result is back
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        raw = bytes(shm.buf[:size])
+    finally:
+        shm.close()
+    return _load(raw, func)
+
+
+class DecodePool:
+    """
+    Decode and transform raw responses in worker processes.
+    func gets the parsed result (ex. the verbose getblock json) and should return
+    something small, since that is what gets pickled back. It runs in another
+    process, so it has to be a module level function.
+    Payloads above SHARED_MEMORY_MIN_SIZE are handed over in shared memory
+    (python 3.8+) instead of being pickled through the pool pipe.
+
+        def flatten(block):
+            return [(tx["hash"], len(tx["outputs"])) for tx in block["tx"]]
+
+        pool = DecodePool(flatten)
+        for block_hash, rows in pool.getblocks(rpc, hashes):
+            ...
+    """
+
+    def __init__(
+        self,
+        func: Callable[[Any], Any],
+        processes: Optional[int] = None,
+        use_shared_memory: bool = True,
+        fetch_workers: int = 8,
+    ):
+        self.func = func
+        self.use_shared_memory = use_shared_memory and shared_memory is not None
+        if self.use_shared_memory:
+            # started before the workers so they share it instead of each
+            # tracking (and unlinking at exit) the segments they attach to
+            from multiprocessing import resource_tracker
+
+            resource_tracker.ensure_running()
+        self.pool = ProcessPoolExecutor(max_workers=processes)
+        self.fetch_workers = fetch_workers
+
+    def submit(self, raw: bytes) -> Future:
+        """
+        raw: response body, ex. RpcClient.rpc_call_raw / Request.get_raw
+        """
+        if not self.use_shared_memory or len(raw) < SHARED_MEMORY_MIN_SIZE:
+            return self.pool.submit(_run_bytes, self.func, raw)
+        shm = shared_memory.SharedMemory(create=True, size=len(raw))
+        shm.buf[: len(raw)] = raw
+        try:
+            future = self.pool.submit(_run_shared, self.func, shm.name, len(raw))
+        except BaseException:
+            _release(shm)
+            raise
+        future.add_done_callback(lambda _: _release(shm))
+        return future
+
+    def map(self, raws: Iterable[bytes]) -> Iterator[Any]:
+        """
+        results in input order
+        """
+        futures = [self.submit(raw) for raw in raws]
+        for future in futures:
+            yield future.result()
+
+    def getblocks(
+        self,
+        client: RpcClient,
+        block_hashes: Iterable[str],
+        verbose: int = 1,
+        details: int = 1,
+        window: int = 64,
+    ) -> Iterator[Tuple[str, Any]]:
+        """
+        fetch getblock(hash, verbose, details) raw in threads, decode in the
+        pool, yields (hash, func(block)) in input order.
+        window: blocks fetched or decoded at the same time, bounds memory
+        """
+        fetcher = ThreadPoolExecutor(max_workers=self.fetch_workers)
+        queue: Deque[Tuple[str, Future]] = deque()
+
+        def fetch(block_hash: str) -> Future:
+            # the fetch thread is free again as soon as the bytes are handed over
+            raw = client.rpc_call_raw("getblock", block_hash, verbose, details)
+            return self.submit(raw)
+
+        try:
+            for block_hash in block_hashes:
+                queue.append((block_hash, fetcher.submit(fetch, block_hash)))
+                if len(queue) >= window:
+                    done_hash, future = queue.popleft()
+                    yield done_hash, future.result().result()
+            while queue:
+                done_hash, future = queue.popleft()
+                yield done_hash, future.result().result()
+        finally:
+            fetcher.shutdown(wait=False)
+
+    def close(self) -> None:
+        self.pool.shutdown()
+
+
+def _release(shm: Any) -> None:
+    try:
+        shm.close()
+        shm.unlink()
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,158 @@
+import json
+import time
+import asyncio
+import functools
+import threading
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from handshake_client.errors import is_error
+
+# seconds a CachedClient keeps a response, by client method name
+TTLS: Dict[str, float] = {
+    # HttpClient
+    "get_info": 1.0,
+    "get_mempool": 1.0,
+    "get_block_by_hash": 60.0,
+    "estimate_fee": 5.0,
+    "get_tx_by_hash": 60.0,
+    # WalletHttpClient
+    "get_wallet_info": 1.0,
+    "get_balance": 1.0,
+    "get_wallet_account_list": 60.0,
+    # RpcClient
+    "getinfo": 1.0,
+    "getblockchaininfo": 1.0,
+    "getbestblockhash": 1.0,
+    "getblockcount": 1.0,
+    "getblock": 60.0,
+    "getblockheader": 60.0,
+    "getblock_raw": 60.0,
+    "getblockheader_raw": 60.0,
+    "getmempoolinfo": 1.0,
+    "estimatefee": 5.0,
+    "estimatesmartfee": 5.0,
+    "getrawtransaction": 60.0,
+    "getrawtransaction_raw": 60.0,
+    "getnameinfo": 1.0,
+    "getnameresource": 1.0,
+    "getauctioninfo": 1.0,
+}
+
+
+def _method(client: Any, name: str) -> Callable[..., Any]:
+    method = getattr(client, name)
+    if name.startswith("_") or not callable(method):
+        raise AttributeError(name)
+    return method
+
+
+class AsyncClient:
+    """
+    Methods of the wrapped client (HttpClient, WalletHttpClient, RpcClient...)
+    as coroutines, the blocking call runs in an executor.
+
+        node = AsyncClient(HttpClient(api_key, host, port))
+        info, mempool = await asyncio.gather(node.get_info(), node.get_mempool())
+    """
+
+    def __init__(self, client: Any, executor: Optional[Executor] = None):
+        self.client = client
+        self.executor = executor
+
+    def __getattr__(self, name: str) -> Callable[..., "asyncio.Future[Any]"]:
+        method = _method(self.client, name)
+
+        def call(*args: Any, **kwargs: Any) -> "asyncio.Future[Any]":
+            loop = asyncio.get_event_loop()
+            send = functools.partial(method, *args, **kwargs)
+            return loop.run_in_executor(self.executor, send)
+
+        return call
+
+
+class CachedClient:
+    """
+    Responses of the wrapped client's methods listed in ttls are kept in memory
+    for ttl seconds (scaled by ttl_scale), errors are never cached. Other
+    methods pass through.
+    """
+
+    def __init__(
+        self,
+        client: Any,
+        ttls: Optional[Dict[str, float]] = None,
+        ttl_scale: float = 1.0,
+    ):
+        """
+        ttls: method name -> seconds, default TTLS
+        """
+        self.client = client
+        self.ttls = TTLS if ttls is None else ttls
+        self.ttl_scale = ttl_scale
+        self.cache: Dict[Tuple[str, str], Tuple[float, Any]] = {}
+        self.lock = threading.Lock()
+
+    def __getattr__(self, name: str) -> Callable[..., Any]:
+        method = _method(self.client, name)
+        ttl = self.ttls.get(name)
+        if ttl is None:
+            return method
+
+        def call(*args: Any, **kwargs: Any) -> Any:
+            values = json.dumps([args, kwargs], sort_keys=True, default=str)
+            key = (name, values)
+            now = time.monotonic()
+            hit = self.cache.get(key)
+            if hit is not None and hit[0] > now:
+                return hit[1]
+            r = method(*args, **kwargs)
+            if not is_error(r):
+                with self.lock:
+                    self.cache[key] = (now + ttl * self.ttl_scale, r)
+            return r
+
+        return call
+
+    def invalidate(self, name: Optional[str] = None) -> None:
+        with self.lock:
+            if name is None:
+                self.cache.clear()
+            else:
+                self.cache = {k: v for k, v in self.cache.items() if k[0] != name}
+
+
+class HttpBatch:
+    """
+    Methods of the wrapped http client queue the call and return its index,
+    execute() runs the queue over max_workers threads and returns the results
+    in order. For RpcClient use rpc.RpcBatch, it sends one JSON-RPC batch.
+
+        batch = HttpBatch(node)
+        for tx_hash in hashes:
+            batch.get_tx_by_hash(tx_hash)
+        txs = batch.execute()
+    """
+
+    def __init__(self, client: Any, max_workers: int = 8):
+        assert type(max_workers) == int and max_workers > 0
+        self.client = client
+        self.max_workers = max_workers
+        self.queue: List[Tuple[Callable[..., Any], Tuple[Any, ...], Dict[str, Any]]]
+        self.queue = []
+
+    def __getattr__(self, name: str) -> Callable[..., int]:
+        method = _method(self.client, name)
+
+        def call(*args: Any, **kwargs: Any) -> int:
+            self.queue.append((method, args, kwargs))
+            return len(self.queue) - 1
+
+        return call
+
+    def execute(self) -> List[Any]:
+        queue, self.queue = self.queue, []
+        if not queue:
+            return []
+        with ThreadPoolExecutor(min(self.max_workers, len(queue))) as executor:
+            futures = [executor.submit(m, *args, **kw) for m, args, kw in queue]
+            return [future.result() for future in futures]
@@ -0,0 +1,33 @@
+from typing import Any
+
+
+class HandshakeError(Exception):
+    """
+    raised by the higher level helpers when a client call returns
+    the handshake Errors format {"error": {"message": "..."}}
+    """
+
+    def __init__(self, message: str, response: Any = None):
+        super().__init__(message)
+        self.response = response
+
+
+class VerifyError(HandshakeError):
+    """
+    data from the node failed local verification
+    """
+
+
+def is_error(result: Any) -> bool:
+    return isinstance(result, dict) and bool(result.get("error"))
+
+
+def unwrap(result: Any) -> Any:
+    """
+    return result as is, or raise HandshakeError for an error response
+    """
+    if is_error(result):
+        error = result["error"]
+        message = error.get("message", "") if isinstance(error, dict) else str(error)
+        raise HandshakeError(message, result)
+    return result
@@ -0,0 +1,318 @@
+import os
+import csv
+import json
+import logging
+from collections import deque
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple
+from handshake_client.errors import unwrap
+from handshake_client.primitives import Block
+from handshake_client.rpc import RpcClient
+
+
+logger = logging.getLogger("handshake.export")
+
+TABLES = {
+    "blocks": [
+        "height",
+        "hash",
+        "time",
+        "prev_block",
+        "merkle_root",
+        "tree_root",
+        "version",
+        "bits",
+        "tx_count",
+    ],
+    "txs": [
+        "height",
+        "txid",
+        "wtxid",
+        "index",
+        "version",
+        "locktime",
+        "input_count",
+        "output_count",
+    ],
+    "inputs": ["height", "txid", "index", "prev_hash", "prev_index", "sequence"],
+    "outputs": [
+        "height",
+        "txid",
+        "index",
+        "value",
+        "address",
+        "covenant_type",
+        "covenant_action",
+    ],
+    # non NONE covenants only, items hex joined with ","
+    "covenants": ["height", "txid", "index", "action", "name_hash", "items"],
+}
+FORMATS = ("parquet", "arrow", "csv")
+EXTENSIONS = {"parquet": ".parquet", "arrow": ".arrow", "csv": ".csv"}
+STATE_FILE = "export.json"
+
+Columns = Dict[str, Dict[str, List[Any]]]
+
+
+def decode_blocks(raw_blocks: List[Tuple[int, str]], hrp: str = "hs") -> Columns:
+    """
+    raw blocks (height, getblock(hash, 0) hex) to columns per table
+    runs in the decode processes, so it only takes and returns plain data
+    """
+    columns: Columns = {
+        table: {name: [] for name in names} for table, names in TABLES.items()
+    }
+    blocks, txs = columns["blocks"], columns["txs"]
+    inputs, outputs = columns["inputs"], columns["outputs"]
+    covenants = columns["covenants"]
+    for height, raw in raw_blocks:
+        block = Block.from_raw(bytes.fromhex(raw))
+        header = block.header
+        for name, value in (
+            ("height", height),
+            ("hash", header.hash),
+            ("time", header.time),
+            ("prev_block", header.prevBlock),
+            ("merkle_root", header.merkleRoot),
+            ("tree_root", header.treeRoot),
+            ("version", header.version),
+            ("bits", header.bits),
+            ("tx_count", len(block.txs)),
+        ):
+            blocks[name].append(value)
+        for tx_index, tx in enumerate(block.txs):
+            for name, value in (
+                ("height", height),
+                ("txid", tx.hash),
+                ("wtxid", tx.witnessHash),
+                ("index", tx_index),
+                ("version", tx.version),
+                ("locktime", tx.locktime),
+                ("input_count", len(tx.inputs)),
+                ("output_count", len(tx.outputs)),
+            ):
+                txs[name].append(value)
+            for index, tx_input in enumerate(tx.inputs):
+                inputs["height"].append(height)
+                inputs["txid"].append(tx.hash)
+                inputs["index"].append(index)
+                inputs["prev_hash"].append(tx_input.prevout.hash)
+                inputs["prev_index"].append(tx_input.prevout.index)
+                inputs["sequence"].append(tx_input.sequence)
+            for index, output in enumerate(tx.outputs):
+                covenant = output.covenant
+                outputs["height"].append(height)
+                outputs["txid"].append(tx.hash)
+                outputs["index"].append(index)
+                outputs["value"].append(output.value)
+                outputs["address"].append(output.address.to_string(hrp))
+                outputs["covenant_type"].append(covenant.type)
+                outputs["covenant_action"].append(covenant.action)
+                if covenant.type == 0:
+                    continue
+                covenants["height"].append(height)
+                covenants["txid"].append(tx.hash)
+                covenants["index"].append(index)
+                covenants["action"].append(covenant.action)
+                covenants["name_hash"].append(
+                    covenant.items[0] if covenant.items else ""
+                )
+                covenants["items"].append(",".join(covenant.items))
+    return columns
+
+
+class BlockExporter:
+    """
+    Export a block range to one file per table and batch
+    (<out_dir>/<table>/<first height>-<last height>.<ext>).
+    Raw blocks are fetched in parallel threads, decoded in a process pool and
+    written while the next batch is fetched; at most max_pending decoded
+    batches are held in memory. The last written height, the format and the
+    columns are kept in export.json, run() continues from there with the same
+    settings.
+
+    format: parquet or arrow (needs pyarrow), csv, or None for parquet when
+            pyarrow is installed and csv otherwise
+    """
+
+    def __init__(
+        self,
+        client: RpcClient,
+        out_dir: str,
+        format: Optional[str] = None,
+        batch_blocks: int = 100,
+        fetch_workers: int = 8,
+        decode_processes: Optional[int] = None,
+        max_pending: int = 4,
+        hrp: str = "hs",
+    ):
+        """
+        decode_processes: None for one per cpu, 0 decodes in the calling thread
+        """
+        assert type(out_dir) == str
+        assert type(batch_blocks) == int and batch_blocks > 0
+        assert type(max_pending) == int and max_pending > 0
+        self.client = client
+        self.out_dir = out_dir
+        self.format = format or ("parquet" if _has_pyarrow() else "csv")
+        assert self.format in FORMATS
+        if self.format != "csv" and not _has_pyarrow():
+            raise ImportError(f"pyarrow is needed for {self.format} export")
+        self.batch_blocks = batch_blocks
+        self.max_pending = max_pending
+        self.hrp = hrp
+        self.fetcher = ThreadPoolExecutor(max_workers=fetch_workers)
+        self.decoder: Optional[Executor] = None
+        if decode_processes != 0:
+            self.decoder = ProcessPoolExecutor(max_workers=decode_processes)
+        os.makedirs(out_dir, exist_ok=True)
+        self.state_path = os.path.join(out_dir, STATE_FILE)
+
+    @property
+    def last_height(self) -> int:
+        """
+        last exported height, -1 when nothing is exported
+        """
+        state = self._load_state()
+        return -1 if state is None else state["height"]
+
+    def run(self, start: int = 0, end: Optional[int] = None) -> int:
+        """
+        export start..end (default: chain tip), resuming after the last exported
+        height. Returns the last exported height.
+        """
+        state = self._load_state()
+        if state is not None:
+            self._check_state(state)
+        last = -1 if state is None else state["height"]
+        start = max(start, last + 1)
+        if end is None:
+            end = unwrap(self.client.getblockcount())
+        self._remove_parts_after(last)
+        batches = (
+            list(range(first, min(first + self.batch_blocks, end + 1)))
+            for first in range(start, end + 1, self.batch_blocks)
+        )
+        fetching: Deque[Tuple[List[int], List[Future]]] = deque()
+        pending: Deque[Tuple[int, int, Any]] = deque()
+        self._submit_fetch(batches, fetching)
+        while fetching:
+            heights, futures = fetching.popleft()
+            # the next batch is fetched while this one is decoded and written
+            self._submit_fetch(batches, fetching)
+            raw_blocks = [future.result() for future in futures]
+            if self.decoder is None:
+                decoded: Any = decode_blocks(raw_blocks, self.hrp)
+            else:
+                decoded = self.decoder.submit(decode_blocks, raw_blocks, self.hrp)
+            pending.append((heights[0], heights[-1], decoded))
+            # the oldest batch is written while newer ones are being decoded
+            while len(pending) >= self.max_pending:
+                self._write(*pending.popleft())
+        while pending:
+            self._write(*pending.popleft())
+        return self.last_height
+
+    def _submit_fetch(
+        self,
+        batches: Iterator[List[int]],
+        fetching: Deque[Tuple[List[int], List[Future]]],
+    ) -> None:
+        heights = next(batches, None)
+        if heights is not None:
+            futures = [self.fetcher.submit(self._fetch, h) for h in heights]
+            fetching.append((heights, futures))
+
+    def _fetch(self, height: int) -> Tuple[int, str]:
+        # verbose=0: raw hex, a fraction of the verbose json size
+        raw = unwrap(self.client.getblockbyheight(height, 0, 0))
+        return height, raw
+
+    def _write(self, first: int, last: int, decoded: Any) -> None:
+        columns = decoded.result() if isinstance(decoded, Future) else decoded
+        for table, data in columns.items():
+            directory = os.path.join(self.out_dir, table)
+            os.makedirs(directory, exist_ok=True)
+            name = f"{first:09d}-{last:09d}{EXTENSIONS[self.format]}"
+            write_table(os.path.join(directory, name), data, self.format)
+        self._save_state(last)
+        logger.info(f"exported blocks {first}-{last}")
+
+    def _load_state(self) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self.state_path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def _check_state(self, state: Dict[str, Any]) -> None:
+        """
+        a resumed export has to write the same files as the parts before it
+        """
+        if state.get("format") != self.format:
+            raise ValueError(
+                f"{self.out_dir} holds a {state.get('format')} export, "
+                f"not {self.format}"
+            )
+        if state.get("columns") != TABLES:
+            raise ValueError(f"{self.out_dir} holds an export with other columns")
+
+    def _save_state(self, height: int) -> None:
+        tmp = self.state_path + ".tmp"
+        with open(tmp, "w") as f:
+            state = {"height": height, "format": self.format, "columns": TABLES}
+            json.dump(state, f)
+        os.replace(tmp, self.state_path)
+
+    def _remove_parts_after(self, height: int) -> None:
+        """
+        files of a batch whose state was never saved (crash while writing)
+        """
+        for table in TABLES:
+            directory = os.path.join(self.out_dir, table)
+            if not os.path.isdir(directory):
+                continue
+            for name in os.listdir(directory):
+                first = name.split("-", 1)[0]
+                if first.isdigit() and int(first) > height:
+                    os.remove(os.path.join(directory, name))
+
+    def close(self) -> None:
+        self.fetcher.shutdown()
+        if self.decoder is not None:
+            self.decoder.shutdown()
+
+
+def write_table(path: str, data: Dict[str, List[Any]], format: str) -> None:
+    """
+    write one table batch, through a temporary file so a crash never leaves
+    a truncated part behind
+    """
+    tmp = path + ".tmp"
+    if format == "csv":
+        names = list(data)
+        with open(tmp, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(names)
+            writer.writerows(zip(*(data[name] for name in names)))
+    else:
+        import pyarrow
+
+        table = pyarrow.table(data)
+        if format == "parquet":
+            import pyarrow.parquet
+
+            pyarrow.parquet.write_table(table, tmp)
+        else:
+            import pyarrow.feather
+
+            pyarrow.feather.write_feather(table, tmp)
+    os.replace(tmp, path)
+
+
+def _has_pyarrow() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
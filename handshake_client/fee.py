@@ -0,0 +1,152 @@
+import asyncio
+import logging
+import threading
+from decimal import Decimal
+from typing import Any, Dict, Iterable, Optional, Union
+from handshake_client.chain import ChainEntry
+from handshake_client.errors import is_error
+from handshake_client.http_ import HttpClient
+from handshake_client.rpc import RpcClient
+
+
+logger = logging.getLogger("handshake.fee")
+
+# dollarydoos per HNS
+COIN = 1000000
+
+
+class FeeOracle:
+    """
+    Fee estimates served from memory.
+    Estimates only change with a new block, so they are fetched once per tip for
+    every target, from chain connect events (attach) or tip polling (poll).
+    When the node errors the last good value is kept.
+    Rates are dollarydoos per kB.
+    """
+
+    def __init__(
+        self,
+        client: Union[HttpClient, RpcClient],
+        targets: Iterable[int] = (1, 2, 3, 6, 12, 24),
+        smart: bool = True,
+    ):
+        """
+        client: HttpClient (estimate_fee) or RpcClient (estimatesmartfee / estimatefee)
+        smart: RpcClient only, use estimatesmartfee instead of estimatefee
+        """
+        self.client = client
+        self.targets = sorted(set(targets))
+        assert self.targets and all(type(t) == int and t > 0 for t in self.targets)
+        self.smart = smart
+        self.rates: Dict[int, int] = {}
+        self.height = -1
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+
+    def estimate(self, blocks: int = 1) -> Optional[int]:
+        """
+        Rate for confirmation within `blocks`, uses the nearest configured
+        target at or below it (a faster target never underpays) and a target
+        above it only when there is none. None until the first successful
+        refresh.
+        """
+        assert type(blocks) == int
+        below = [t for t in reversed(self.targets) if t <= blocks]
+        above = [t for t in self.targets if t > blocks]
+        for target in below + above:
+            if target in self.rates:
+                return self.rates[target]
+        return None
+
+    def refresh(self) -> Dict[int, int]:
+        rates = dict(self.rates)
+        for target in self.targets:
+            try:
+                rate = self._fetch(target)
+            except Exception as e:
+                logger.warning(f"fee estimate for {target} blocks failed: {e}")
+                continue
+            if rate is not None:
+                rates[target] = rate
+        self.rates = rates
+        return rates
+
+    def on_tip(self, height: int) -> None:
+        """
+        refresh if height is a new tip
+        """
+        with self.lock:
+            if height == self.height:
+                return
+            self.height = height
+            self.refresh()
+
+    def poll(self) -> None:
+        """
+        check the node tip once and refresh when it moved
+        """
+        height = self._tip_height()
+        if height is not None:
+            self.on_tip(height)
+
+    def start_polling(self, interval: float = 10.0) -> threading.Thread:
+        """
+        fallback when no socket is available, polls in a daemon thread
+        """
+
+        def run() -> None:
+            while not self.stop_event.wait(interval):
+                self.poll()
+
+        self.poll()
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        return thread
+
+    def stop(self) -> None:
+        self.stop_event.set()
+
+    async def attach(self, sio: Any) -> None:
+        """
+        refresh on 'chain connect' of a node socket (sockets.get_connection)
+        """
+
+        async def chain_connect(raw_entry: bytes) -> None:
+            entry = ChainEntry.from_raw(raw_entry)
+            loop = asyncio.get_event_loop()
+            await loop.run_in_executor(None, self.on_tip, entry.height)
+
+        sio.on("chain connect", chain_connect)
+
+    def _fetch(self, target: int) -> Optional[int]:
+        if isinstance(self.client, HttpClient):
+            r = self.client.estimate_fee(target)
+            if is_error(r):
+                raise ValueError(r["error"])
+            rate = r["rate"]
+        else:
+            if self.smart:
+                r = self.client.estimatesmartfee(target)
+                if is_error(r):
+                    raise ValueError(r["error"])
+                fee = r["fee"]
+            else:
+                fee = self.client.estimatefee(target)
+                if is_error(fee):
+                    raise ValueError(fee["error"])
+            # rpc returns HNS per kB
+            rate = int(Decimal(str(fee)) * COIN)
+        if rate <= 0:
+            return None
+        return rate
+
+    def _tip_height(self) -> Optional[int]:
+        if isinstance(self.client, HttpClient):
+            r = self.client.get_info()
+            if is_error(r):
+                return None
+            return r["chain"]["height"]
+        r = self.client.getblockcount()
+        if is_error(r):
+            return None
+        return r
@@ -0,0 +1,160 @@
+import os
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
+from handshake_client.constant import POW_LIMIT_BITS
+from handshake_client.errors import VerifyError, unwrap
+from handshake_client.primitives import BlockHeader, to_target
+from handshake_client.rpc import RpcClient
+
+
+logger = logging.getLogger("handshake.headers")
+
+ZERO_HASH = "00" * 32
+
+
+class HeaderSync:
+    """
+    Header only chain sync.
+    Raw headers are fetched in parallel with getblockhash + getblockheader(hash, 0),
+    checked for prevBlock linkage, proof of work and the network's pow limit
+    (difficulty retargeting is not checked), and appended to a flat file
+    (236 bytes per header, height = start_height + index).
+    """
+
+    def __init__(
+        self,
+        client: RpcClient,
+        path: str,
+        start_height: int = 0,
+        workers: int = 8,
+        batch_size: int = 256,
+        checkpoint: Optional[str] = None,
+        network: str = "main",
+    ):
+        """
+        start_height: first height to store. The header at start_height (genesis
+        by default) is the anchor: its proof of work is not checked, genesis
+        does not meet its own bits, and when start_height is not 0 neither is
+        its prevBlock.
+        checkpoint: trusted hash of the anchor header, checked when it is stored
+        network: main, testnet, regtest or simnet, for the pow limit
+        """
+        assert type(path) == str
+        assert type(start_height) == int
+        assert type(workers) == int
+        assert type(batch_size) == int
+        assert checkpoint is None or type(checkpoint) == str
+        assert network in POW_LIMIT_BITS
+        self.client = client
+        self.path = path
+        self.start_height = start_height
+        self.batch_size = batch_size
+        self.checkpoint = checkpoint
+        self.pow_limit = to_target(POW_LIMIT_BITS[network])
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.file = open(path, "a+b")
+        size = os.path.getsize(path)
+        if size % BlockHeader.SIZE != 0:
+            # drop a torn write from a previous crash
+            size -= size % BlockHeader.SIZE
+            self.file.truncate(size)
+        self.count = size // BlockHeader.SIZE
+        self.tip: Optional[BlockHeader] = None
+        if self.count > 0:
+            self.tip = self.get_header(self.height)
+
+    @property
+    def height(self) -> int:
+        """
+        height of the stored tip, start_height - 1 when nothing is stored
+        """
+        return self.start_height + self.count - 1
+
+    def get_header(self, height: int) -> Optional[BlockHeader]:
+        assert type(height) == int
+        if height < self.start_height or height > self.height:
+            return None
+        self.file.seek((height - self.start_height) * BlockHeader.SIZE)
+        return BlockHeader.from_raw(self.file.read(BlockHeader.SIZE))
+
+    def sync(self, target: Optional[int] = None) -> int:
+        """
+        sync up to target height (default: node tip) and return the stored height
+        """
+        assert target is None or type(target) == int
+        if target is None:
+            target = unwrap(self.client.getblockcount())
+        while self.height < target:
+            end = min(self.height + self.batch_size, target)
+            heights = range(self.height + 1, end + 1)
+            fetched = list(self.executor.map(self._fetch, heights))
+            if not self._connect(fetched):
+                self._rewind()
+        return self.height
+
+    def _fetch(self, height: int) -> Tuple[str, bytes]:
+        block_hash = unwrap(self.client.getblockhash(height))
+        raw = unwrap(self.client.getblockheader(block_hash, 0))
+        return block_hash, bytes.fromhex(raw)
+
+    def _connect(self, fetched: List[Tuple[str, bytes]]) -> bool:
+        """
+        verify and store headers in order.
+        returns False when the first header does not link to the stored tip.
+        """
+        prev_hash = self.tip.hash if self.tip else None
+        if prev_hash is None and self.start_height == 0:
+            prev_hash = ZERO_HASH
+        buffer = bytearray()
+        header = None
+        # nothing stored yet, the first header is the anchor
+        anchor = self.count == 0
+        for block_hash, raw in fetched:
+            header = BlockHeader.from_raw(raw)
+            if header.hash != block_hash:
+                raise VerifyError(f"header hash mismatch {block_hash}")
+            target = to_target(header.bits)
+            if target <= 0 or target > self.pow_limit:
+                raise VerifyError(f"bits above the pow limit {block_hash}")
+            if anchor:
+                anchor = False
+                if self.checkpoint is not None and header.hash != self.checkpoint:
+                    raise VerifyError(f"header {block_hash} is not the checkpoint")
+            elif not header.verify_pow():
+                raise VerifyError(f"bad proof of work {block_hash}")
+            if prev_hash is not None and header.prevBlock != prev_hash:
+                if len(buffer) == 0:
+                    return False
+                # the node reorged while fetching, next sync round detects it
+                break
+            prev_hash = header.hash
+            buffer += raw
+            self.tip = header
+        self.file.seek(0, os.SEEK_END)
+        self.file.write(buffer)
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.count += len(buffer) // BlockHeader.SIZE
+        return True
+
+    def _rewind(self) -> None:
+        """
+        walk back to the last stored header the node still has in its main chain
+        """
+        height = self.height
+        while height >= self.start_height:
+            stored = self.get_header(height)
+            if stored and unwrap(self.client.getblockhash(height)) == stored.hash:
+                break
+            height -= 1
+        if height < self.start_height:
+            raise VerifyError("no common ancestor with the node")
+        logger.info(f"reorg: rewinding headers from {self.height} to {height}")
+        self.count = height - self.start_height + 1
+        self.file.truncate(self.count * BlockHeader.SIZE)
+        self.tip = self.get_header(height)
+
+    def close(self) -> None:
+        self.executor.shutdown()
+        self.file.close()
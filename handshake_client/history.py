@@ -0,0 +1,168 @@
+import json
+import time
+import sqlite3
+import threading
+from typing import Any, Dict, List, Optional, Set
+from handshake_client.errors import unwrap
+from handshake_client.http_ import WalletHttpClient
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS txs (
+    hash TEXT PRIMARY KEY,
+    height INTEGER NOT NULL,
+    time INTEGER NOT NULL,
+    mtime INTEGER NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS txs_mtime ON txs (mtime);
+CREATE INDEX IF NOT EXISTS txs_height ON txs (height);
+CREATE TABLE IF NOT EXISTS tx_accounts (
+    account TEXT NOT NULL,
+    hash TEXT NOT NULL,
+    mtime INTEGER NOT NULL,
+    PRIMARY KEY (account, hash)
+);
+CREATE INDEX IF NOT EXISTS tx_accounts_mtime ON tx_accounts (account, mtime);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL);
+"""
+
+
+class WalletHistory:
+    """
+    Local copy of a wallet transaction history in SQLite.
+    sync() only asks the wallet for transactions newer than the stored cursor
+    (tx/range by mtime), apply_event() takes wallet socket events
+    (wallet_events.WalletEventStream) in between. Queries run on the local copy.
+    """
+
+    def __init__(
+        self,
+        wallet: WalletHttpClient,
+        path: str,
+        account: str = "",
+        overlap: int = 600,
+    ):
+        """
+        account: account to sync, empty string for the whole wallet
+        overlap: seconds re-read before the cursor, covers clock skew and
+                 transactions added while the last sync was running
+        """
+        assert type(path) == str
+        assert type(account) == str
+        assert type(overlap) == int
+        self.wallet = wallet
+        self.account = account
+        self.overlap = overlap
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.executescript(SCHEMA)
+
+    @property
+    def cursor(self) -> int:
+        row = self.db.execute("SELECT value FROM meta WHERE key = 'cursor'").fetchone()
+        return row[0] if row else 0
+
+    def sync(self, now: Optional[int] = None) -> int:
+        """
+        fetch new transactions, returns the number of stored (new or updated) txs
+        """
+        end = now if now is not None else int(time.time())
+        start = max(0, self.cursor - self.overlap)
+        txs = unwrap(self.wallet.get_range_of_transactions(self.account, start, end))
+        rows = self.db.execute(
+            "SELECT hash FROM txs WHERE height < 0 AND mtime < ?", (start,)
+        )
+        pending = [row[0] for row in rows]
+        # unconfirmed txs older than the window may have been confirmed since
+        for tx_hash in pending:
+            details = self.wallet.get_tx_details(tx_hash)
+            if isinstance(details, dict) and "hash" in details:
+                txs.append(details)
+        with self.lock, self.db:
+            for tx in txs:
+                self._store(tx)
+            cursor = max([self.cursor] + [tx.get("mtime", 0) for tx in txs])
+            self.db.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('cursor', ?)",
+                (cursor,),
+            )
+        return len(txs)
+
+    def apply_event(self, event: Any) -> None:
+        """
+        WalletTxEvent from wallet_events, 'conflict' removes the tx
+        """
+        with self.lock, self.db:
+            if event.event == "conflict":
+                self.db.execute("DELETE FROM txs WHERE hash = ?", (event.hash,))
+                self.db.execute(
+                    "DELETE FROM tx_accounts WHERE hash = ?", (event.hash,)
+                )
+                return
+            self._store(event.data)
+
+    def _store(self, tx: Dict[str, Any]) -> None:
+        tx_hash = tx["hash"]
+        mtime = tx.get("mtime", 0)
+        self.db.execute(
+            "INSERT OR REPLACE INTO txs (hash, height, time, mtime, data)"
+            " VALUES (?, ?, ?, ?, ?)",
+            (tx_hash, tx.get("height", -1), tx.get("time", 0), mtime, json.dumps(tx)),
+        )
+        self.db.executemany(
+            "INSERT OR REPLACE INTO tx_accounts (account, hash, mtime)"
+            " VALUES (?, ?, ?)",
+            [(account, tx_hash, mtime) for account in tx_accounts(tx)],
+        )
+
+    def get(self, tx_hash: str) -> Optional[Dict[str, Any]]:
+        query = "SELECT data FROM txs WHERE hash = ?"
+        row = self.db.execute(query, (tx_hash,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def by_account(
+        self, account: str, limit: int = 100, offset: int = 0
+    ) -> List[Dict[str, Any]]:
+        """
+        newest first
+        """
+        rows = self.db.execute(
+            "SELECT t.data FROM tx_accounts a JOIN txs t ON t.hash = a.hash"
+            " WHERE a.account = ? ORDER BY a.mtime DESC LIMIT ? OFFSET ?",
+            (account, limit, offset),
+        )
+        return [json.loads(row[0]) for row in rows]
+
+    def range(
+        self, start: int, end: int, account: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        transactions with start <= mtime <= end, oldest first
+        """
+        if account is None:
+            rows = self.db.execute(
+                "SELECT data FROM txs WHERE mtime BETWEEN ? AND ? ORDER BY mtime",
+                (start, end),
+            )
+        else:
+            rows = self.db.execute(
+                "SELECT t.data FROM tx_accounts a JOIN txs t ON t.hash = a.hash"
+                " WHERE a.account = ? AND a.mtime BETWEEN ? AND ? ORDER BY a.mtime",
+                (account, start, end),
+            )
+        return [json.loads(row[0]) for row in rows]
+
+    def close(self) -> None:
+        self.db.close()
+
+
+def tx_accounts(tx: Dict[str, Any]) -> Set[str]:
+    """
+    accounts touched by a wallet tx, from the input/output paths
+    """
+    accounts = set()
+    for member in tx.get("inputs", []) + tx.get("outputs", []):
+        path = member.get("path")
+        if path and path.get("name") is not None:
+            accounts.add(path["name"])
+    return accounts
@@ -1,21 +1,85 @@
 import json
-from requests import get, post, put, delete
-from requests.exceptions import ConnectionError, HTTPError
-from typing import cast, Optional, Union, List, Dict, Any
-from handshake_client.constant import TIMEOUT
+from typing import cast, Optional, Union, List, Dict, Any, Tuple, TYPE_CHECKING
+from handshake_client.compression import accept_encoding, read_response
+from handshake_client.constant import TIMEOUT, JOB_TIMEOUT
+from handshake_client.jobs import AdminJob, Progress
+
+if TYPE_CHECKING:
+    # requests is imported on first use, see Request.try_request
+    from requests import Session
+    from handshake_client.limiter import AdaptiveLimiter
 
 
 class Request:
-    def __init__(self, endpoint: str, timeout: int = TIMEOUT):
+    def __init__(
+        self,
+        endpoint: str,
+        timeout: int = TIMEOUT,
+        session: Optional["Session"] = None,
+        limiter: Optional["AdaptiveLimiter"] = None,
+        transport: Any = None,
+        compression: bool = False,
+    ):
+        """
+        session: shared requests.Session (connection pool), default is no pooling
+        limiter: limiter.AdaptiveLimiter shared by the clients of one node
+        transport: transport.Recorder or transport.Replayer, default is the network
+        compression: ask for compressed responses and decode them while they stream
+                     in (see compression.py), worth it over slow links. False asks
+                     for identity, which is cheaper on a local node
+        """
         assert type(endpoint) == str
         assert type(timeout) == int
+        if session is not None:
+            from requests import Session
+
+            assert isinstance(session, Session)
         self.endpoint = endpoint
         self.timeout = timeout
+        self.session = session
+        self.limiter = limiter
+        self.transport = transport
+        self.compression = compression
+
+    def _accept(self) -> Dict[str, str]:
+        if not self.compression:
+            return {"Accept-Encoding": "identity"}
+        return {"Accept-Encoding": accept_encoding()}
+
+    def _content(self, response: Any) -> bytes:
+        """
+        body of a response, requested with stream=self.compression
+        """
+        return read_response(response) if self.compression else response.content
 
     def get(self, path: str) -> Any:
         assert type(path) == str
         return self.try_request("GET", path)
 
+    def get_raw(self, path: str) -> bytes:
+        """
+        response body without parsing it, for decoder.DecodePool
+        """
+        assert type(path) == str
+        import requests
+        from requests.exceptions import ConnectionError, HTTPError
+
+        http: Any = requests if self.session is None else self.session
+        try:
+            r = http.get(
+                self.endpoint + "/" + path,
+                headers=self._accept(),
+                timeout=self.timeout,
+                stream=self.compression,
+            )
+            r.raise_for_status()
+        except ConnectionError as e:
+            # return handshake Errors format
+            return json.dumps({"error": {"message": str(e)}}).encode()
+        except HTTPError as e:
+            return self._content(e.response)
+        return self._content(r)
+
     def post(
         self, path: str, params: Dict[str, Any]
     ) -> Any:
@@ -44,36 +108,77 @@ class Request:
         assert method in ["GET", "POST", "PUT", "DELETE"]
         assert type(path) == str
         assert params is None or type(params) == dict
+        if self.limiter is None:
+            return self._exchange(method, path, params)[0]
+        # limited per method and resource, ex. "GET block"
+        key = method + " " + path.split("?")[0].split("/")[0]
+        with self.limiter.slot(key) as permit:
+            r, permit.dropped = self._exchange(method, path, params)
+        return r
+
+    def _exchange(
+        self, method: str, path: str, params: Optional[Dict[str, Any]]
+    ) -> Tuple[Any, bool]:
+        if self.transport is None:
+            return self._send(method, path, params)
+        return self.transport.send_http(
+            self._send, self.endpoint, method, path, params
+        )
+
+    def _send(
+        self, method: str, path: str, params: Optional[Dict[str, Any]]
+    ) -> Tuple[Any, bool]:
+        """
+        (response, True when the node looked overloaded)
+        """
+        # imported here so that importing the package does not load requests
+        import requests
+        from requests.exceptions import ConnectionError, HTTPError
+
+        http: Any = requests if self.session is None else self.session
         try:
-            headers = {"Content-Type": "application/json"}
+            # compressed bodies are decoded while they stream in, see compression.py
+            accept = self._accept()
+            headers = {"Content-Type": "application/json", **accept}
             if method == "GET":
-                r = get(self.endpoint + "/" + path, timeout=self.timeout)
+                r = http.get(
+                    self.endpoint + "/" + path,
+                    headers=accept,
+                    timeout=self.timeout,
+                    stream=self.compression,
+                )
             elif method == "POST":
-                r = post(
+                r = http.post(
                     self.endpoint + "/" + path,
                     data=json.dumps(params),
                     headers=headers,
                     timeout=self.timeout,
+                    stream=self.compression,
                 )
             elif method == "PUT":
-                r = put(
+                r = http.put(
                     self.endpoint + "/" + path,
                     data=json.dumps(params),
+                    headers=accept,
                     timeout=self.timeout,
+                    stream=self.compression,
                 )
             elif method == "DELETE":
-                r = delete(
+                r = http.delete(
                     self.endpoint + "/" + path,
                     data=json.dumps(params),
+                    headers=accept,
                     timeout=self.timeout,
+                    stream=self.compression,
                 )
             r.raise_for_status()
         except ConnectionError as e:
             # return handshake Errors format
-            return {"error": {"message": str(e)}}
+            return {"error": {"message": str(e)}}, True
         except HTTPError as e:
-            return json.loads(e.response.content)
-        return r.json()
+            overloaded = e.response.status_code >= 500
+            return json.loads(self._content(e.response)), overloaded
+        return json.loads(self._content(r)), False
 
 
 class HttpClient:
@@ -85,7 +190,14 @@ class HttpClient:
         user: str = "x",
         ssl: bool = False,
         timeout: int = TIMEOUT,
+        session: Optional["Session"] = None,
+        limiter: Optional["AdaptiveLimiter"] = None,
+        transport: Any = None,
+        compression: bool = False,
     ):
+        """
+        session, limiter, transport, compression: see Request
+        """
         assert type(api_key) == str
         assert type(host) == str
         assert type(port) == str
@@ -96,7 +208,9 @@ class HttpClient:
         if ssl is True:
             schema = "https"
         endpoint = f"{schema}://{user}:{api_key}@{host}:{port}"
-        self.request = Request(endpoint, timeout)
+        self.request = Request(
+            endpoint, timeout, session, limiter, transport, compression
+        )
 
     def get_info(self) -> Dict[str, Any]:
         r = self.request.get("")
@@ -208,7 +322,14 @@ class WalletHttpClient:
         user: str = "x",
         ssl: bool = False,
         timeout: int = TIMEOUT,
+        session: Optional["Session"] = None,
+        limiter: Optional["AdaptiveLimiter"] = None,
+        transport: Any = None,
+        compression: bool = False,
     ):
+        """
+        session, limiter, transport, compression: see Request
+        """
         assert type(wallet_id) == str
         assert type(api_key) == str
         assert type(host) == str
@@ -220,7 +341,9 @@ class WalletHttpClient:
         if ssl is True:
             schema = "https"
         endpoint = f"{schema}://{user}:{api_key}@{host}:{port}/wallet/{wallet_id}"
-        self.request = Request(endpoint, timeout)
+        self.request = Request(
+            endpoint, timeout, session, limiter, transport, compression
+        )
 
     def create_wallet(
         self,
@@ -603,13 +726,17 @@ class WalletHttpClient:
         """
         Note that there are other options documented that `getRange` accepts in the options body, `limit` and `reverse`.
         At the time of writing however they do not have any effect.
+        account: account name, empty string for all accounts
         start: start unixtime to get range from
         end: end unixtime to get range from
         """
         assert type(account) == str
         assert type(start) == int
         assert type(end) == int
-        r = self.request.get(f"tx/range?start={start}&end={end}")
+        path = f"tx/range?start={start}&end={end}"
+        if account:
+            path += f"&account={account}"
+        r = self.request.get(path)
         result = cast(List[Dict[str, Any]], r)
         return result
 
@@ -953,7 +1080,14 @@ class WalletAdminCommand:
         user: str = "x",
         ssl: bool = False,
         timeout: int = TIMEOUT,
+        session: Optional["Session"] = None,
+        limiter: Optional["AdaptiveLimiter"] = None,
+        transport: Any = None,
+        compression: bool = False,
     ):
+        """
+        session, limiter, transport, compression: see Request
+        """
         assert type(api_key) == str
         assert type(host) == str
         assert type(port) == str
@@ -964,7 +1098,9 @@ class WalletAdminCommand:
         if ssl is True:
             schema = "https"
         endpoint = f"{schema}://{user}:{api_key}@{host}:{port}/"
-        self.request = Request(endpoint, timeout)
+        self.request = Request(
+            endpoint, timeout, session, limiter, transport, compression
+        )
 
     def rescan(self, height: int) -> Dict[str, bool]:
         assert type(height) == int
@@ -977,7 +1113,7 @@ class WalletAdminCommand:
         """
         Rebroadcast all pending transactions in all wallets.
         """
-        r = self.request.post("rescan", {})
+        r = self.request.post("resend", {})
         result = cast(Dict[str, bool], r)
         return result
 
@@ -997,3 +1133,39 @@ class WalletAdminCommand:
         r = self.request.get("wallet")
         result = cast(List[str], r)
         return result
+
+    # Long running commands as jobs
+    def _job_request(self, timeout: int) -> Request:
+        # own timeout, the default one is far too short for a rescan
+        assert type(timeout) == int
+        return Request(
+            self.request.endpoint,
+            timeout,
+            self.request.session,
+            transport=self.request.transport,
+            compression=self.request.compression,
+        )
+
+    def start_rescan(
+        self,
+        height: int,
+        progress: Optional[Progress] = None,
+        timeout: int = JOB_TIMEOUT,
+    ) -> AdminJob:
+        """
+        rescan without blocking, see AdminJob
+        progress: ex. jobs.rescan_progress(wallet_rpc, node_rpc)
+        """
+        assert type(height) == int
+        request = self._job_request(timeout)
+        params = {"height": height}
+        return AdminJob("rescan", lambda: request.post("rescan", params), progress)
+
+    def start_resend(self, timeout: int = JOB_TIMEOUT) -> AdminJob:
+        request = self._job_request(timeout)
+        return AdminJob("resend", lambda: request.post("resend", {}))
+
+    def start_backup(self, path: str, timeout: int = JOB_TIMEOUT) -> AdminJob:
+        assert type(path) == str
+        request = self._job_request(timeout)
+        return AdminJob("backup", lambda: request.post(f"backup?path={path}", {}))
@@ -0,0 +1,90 @@
+import time
+import logging
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Optional, Tuple
+
+
+logger = logging.getLogger("handshake.jobs")
+
+Progress = Callable[[], Optional[Tuple[int, int]]]
+
+
+class AdminJob:
+    """
+    Long running admin call (rescan, resend, backup) running in its own thread.
+    wait() / wait_async() have their own deadline and leave the job running when
+    they time out or are cancelled, the job can be waited again later.
+    """
+
+    def __init__(
+        self, name: str, func: Callable[[], Any], progress: Optional[Progress] = None
+    ):
+        """
+        progress: returns (current height, target height), see rescan_progress
+        """
+        self.name = name
+        self.progress_func = progress
+        self.started = time.time()
+        self.future: Future = Future()
+        self.thread = threading.Thread(target=self._run, args=(func,), daemon=True)
+        self.thread.start()
+
+    def _run(self, func: Callable[[], Any]) -> None:
+        # a running future can not be cancelled by a waiter
+        self.future.set_running_or_notify_cancel()
+        try:
+            self.future.set_result(func())
+        except Exception as e:
+            logger.exception(f"{self.name} failed")
+            self.future.set_exception(e)
+
+    def done(self) -> bool:
+        return self.future.done()
+
+    def progress(self) -> Optional[Tuple[int, int]]:
+        """
+        (current, target) or None when unknown
+        """
+        if self.progress_func is None:
+            return None
+        try:
+            return self.progress_func()
+        except Exception as e:
+            logger.warning(f"{self.name} progress failed: {e}")
+            return None
+
+    def wait(self, timeout: Optional[float] = None) -> Any:
+        """
+        result of the admin call, raises concurrent.futures.TimeoutError on deadline
+        """
+        return self.future.result(timeout)
+
+    async def wait_async(self, timeout: Optional[float] = None) -> Any:
+        """
+        raises asyncio.TimeoutError on deadline, cancelling the waiting task
+        does not cancel the job
+        """
+        import asyncio
+
+        return await asyncio.wait_for(
+            asyncio.shield(asyncio.wrap_future(self.future)), timeout
+        )
+
+
+def rescan_progress(wallet_rpc: Any, node_rpc: Any) -> Progress:
+    """
+    Compare the wallet tip (getwalletinfo height on the wallet rpc port)
+    with the chain tip (getblockcount on the node rpc port).
+    """
+
+    def progress() -> Optional[Tuple[int, int]]:
+        info = wallet_rpc.rpc_call("getwalletinfo")
+        chain_height = node_rpc.getblockcount()
+        if not isinstance(info, dict) or "height" not in info:
+            return None
+        if not isinstance(chain_height, int):
+            return None
+        return info["height"], chain_height
+
+    return progress
@@ -0,0 +1,286 @@
+import time
+import logging
+import threading
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, Iterator, Optional, Tuple
+
+
+logger = logging.getLogger("handshake.limiter")
+
+
+class TokenBucket:
+    """
+    rate: tokens per second, burst: bucket size
+    """
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        assert rate > 0
+        self.rate = rate
+        self.burst = burst if burst is not None else max(1.0, rate)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """
+        take a token, returns how long the caller has to wait before using it
+        """
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(
+                self.burst, self.tokens + (now - self.updated) * self.rate
+            )
+            self.updated = now
+            self.tokens -= 1
+            if self.tokens >= 0:
+                return 0.0
+            return -self.tokens / self.rate
+
+
+@dataclass()
+class MethodStats:
+    calls: int = 0
+    dropped: int = 0
+    # seconds spent queued (token bucket + concurrency limit)
+    wait_total: float = 0.0
+    wait_max: float = 0.0
+    # smoothed latency and its slowly rising minimum, see AdaptiveLimiter
+    latency: float = 0.0
+    baseline: float = 0.0
+
+
+@dataclass()
+class LimiterStats:
+    limit: float
+    inflight: int
+    waiting: int
+    methods: Dict[str, MethodStats] = field(default_factory=dict)
+
+
+@dataclass()
+class Permit:
+    method: str
+    started: float
+    waited: float
+    # set by the caller when the node looked overloaded (timeout, 5xx, refused)
+    dropped: bool = False
+
+
+class _Waiter:
+    __slots__ = ("event", "loop", "future", "granted")
+
+    def __init__(self, loop: Any = None):
+        self.loop = loop
+        self.event = threading.Event() if loop is None else None
+        self.future = loop.create_future() if loop is not None else None
+        self.granted = False
+
+    def grant(self) -> None:
+        self.granted = True
+        if self.event is not None:
+            self.event.set()
+        else:
+            self.loop.call_soon_threadsafe(_resolve, self.future)
+
+
+def _resolve(future: Any) -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+class AdaptiveLimiter:
+    """
+    Concurrency limit for calls to one node, shared by sync and async callers
+    (http_.Request and rpc.RpcClient take it as `limiter`).
+
+    The limit follows AIMD: each completed call adds increase/limit (about
+    +increase per round of calls), a dropped call or a latency above
+    tolerance x the method baseline multiplies it by backoff, at most once
+    per smoothed latency. Latency is tracked per method, so slow calls like
+    getblock with details are not compared with cheap ones like getblockcount.
+    Callers over the limit wait in one FIFO queue.
+
+    buckets: optional per-method token buckets, {method: (rate, burst)}
+    """
+
+    def __init__(
+        self,
+        initial: int = 8,
+        min_limit: int = 1,
+        max_limit: int = 64,
+        increase: float = 1.0,
+        backoff: float = 0.7,
+        tolerance: float = 2.0,
+        smoothing: float = 0.2,
+        buckets: Optional[Dict[str, Tuple[float, Optional[float]]]] = None,
+    ):
+        assert 1 <= min_limit <= initial <= max_limit
+        assert 0 < backoff < 1
+        assert tolerance > 1
+        self.limit = float(initial)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.increase = increase
+        self.backoff = backoff
+        self.tolerance = tolerance
+        self.smoothing = smoothing
+        self.buckets = {
+            method: TokenBucket(rate, burst)
+            for method, (rate, burst) in (buckets or {}).items()
+        }
+        self.inflight = 0
+        self.waiters: Deque[_Waiter] = deque()
+        self.methods: Dict[str, MethodStats] = {}
+        self.last_backoff = 0.0
+        self.lock = threading.Lock()
+
+    # sync
+    def acquire(self, method: str = "") -> Permit:
+        start = time.monotonic()
+        bucket = self.buckets.get(method)
+        if bucket is not None:
+            delay = bucket.reserve()
+            if delay > 0:
+                time.sleep(delay)
+        waiter = None
+        with self.lock:
+            if not self._take():
+                waiter = _Waiter()
+                self.waiters.append(waiter)
+        if waiter is not None:
+            waiter.event.wait()
+        return self._permit(method, start)
+
+    @contextmanager
+    def slot(self, method: str = "") -> Iterator[Permit]:
+        """
+        with limiter.slot("getblock") as permit:
+            ...
+            permit.dropped = node_was_overloaded
+        """
+        permit = self.acquire(method)
+        try:
+            yield permit
+        except BaseException:
+            permit.dropped = True
+            raise
+        finally:
+            self.release(permit)
+
+    # async
+    async def acquire_async(self, method: str = "") -> Permit:
+        import asyncio
+
+        start = time.monotonic()
+        bucket = self.buckets.get(method)
+        if bucket is not None:
+            delay = bucket.reserve()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        waiter = None
+        with self.lock:
+            if not self._take():
+                waiter = _Waiter(asyncio.get_event_loop())
+                self.waiters.append(waiter)
+        if waiter is None:
+            return self._permit(method, start)
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            with self.lock:
+                granted = waiter.granted
+                if not granted:
+                    self.waiters.remove(waiter)
+            if granted:
+                # the slot was handed over while we were being cancelled
+                self._free()
+            raise
+        return self._permit(method, start)
+
+    def aslot(self, method: str = "") -> "_AsyncSlot":
+        """
+        async with limiter.aslot("getblock") as permit:
+            ...
+        """
+        return _AsyncSlot(self, method)
+
+    def release(self, permit: Permit) -> None:
+        latency = time.monotonic() - permit.started
+        with self.lock:
+            self._update(permit, latency)
+        self._free()
+
+    def stats(self) -> LimiterStats:
+        with self.lock:
+            methods = {k: MethodStats(**vars(v)) for k, v in self.methods.items()}
+            return LimiterStats(self.limit, self.inflight, len(self.waiters), methods)
+
+    def _take(self) -> bool:
+        # lock held; queued callers go first
+        if self.waiters or self.inflight >= int(self.limit):
+            return False
+        self.inflight += 1
+        return True
+
+    def _free(self) -> None:
+        with self.lock:
+            self.inflight -= 1
+            while self.waiters and self.inflight < int(self.limit):
+                self.inflight += 1
+                self.waiters.popleft().grant()
+
+    def _permit(self, method: str, start: float) -> Permit:
+        now = time.monotonic()
+        waited = now - start
+        with self.lock:
+            stats = self.methods.get(method)
+            if stats is None:
+                stats = self.methods[method] = MethodStats()
+            stats.calls += 1
+            stats.wait_total += waited
+            stats.wait_max = max(stats.wait_max, waited)
+        return Permit(method, now, waited)
+
+    def _update(self, permit: Permit, latency: float) -> None:
+        # lock held
+        stats = self.methods[permit.method]
+        if stats.latency == 0.0:
+            stats.latency = stats.baseline = latency
+        else:
+            stats.latency += self.smoothing * (latency - stats.latency)
+            if stats.latency < stats.baseline:
+                stats.baseline = stats.latency
+            else:
+                # drift up slowly, the node may just have become slower
+                stats.baseline += 0.01 * (stats.latency - stats.baseline)
+        overloaded = permit.dropped or stats.latency > stats.baseline * self.tolerance
+        if permit.dropped:
+            stats.dropped += 1
+        now = time.monotonic()
+        if overloaded:
+            # one backoff per round of calls, not one per call of the same round
+            if now - self.last_backoff >= stats.latency:
+                self.last_backoff = now
+                self.limit = max(self.min_limit, self.limit * self.backoff)
+                logger.debug(f"limit down to {self.limit:.1f} ({permit.method})")
+        else:
+            self.limit = min(self.max_limit, self.limit + self.increase / self.limit)
+
+
+class _AsyncSlot:
+    def __init__(self, limiter: AdaptiveLimiter, method: str):
+        self.limiter = limiter
+        self.method = method
+        self.permit: Optional[Permit] = None
+
+    async def __aenter__(self) -> Permit:
+        self.permit = await self.limiter.acquire_async(self.method)
+        return self.permit
+
+    async def __aexit__(self, exc_type: Any, exc: Any, tb: Any) -> None:
+        assert self.permit is not None
+        if exc_type is not None:
+            self.permit.dropped = True
+        self.limiter.release(self.permit)
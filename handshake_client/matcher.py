@@ -0,0 +1,135 @@
+import math
+from bisect import bisect_left
+from typing import Any, Dict, Iterable, List, Sequence, Tuple, Union
+from handshake_client.primitives import Address, Block
+
+
+class _PackedKeys:
+    """
+    sorted fixed width keys packed in one bytes object, searched with bisect
+    """
+
+    def __init__(self, keys: List[bytes], width: int):
+        self.width = width
+        self.data = b"".join(sorted(set(keys)))
+        self.count = len(self.data) // width
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __getitem__(self, index: int) -> bytes:
+        start = index * self.width
+        return self.data[start : start + self.width]
+
+    def __contains__(self, key: bytes) -> bool:
+        index = bisect_left(self, key)
+        return index < self.count and self[index] == key
+
+
+class AddressMatcher:
+    """
+    Address set matching for block scanning.
+    A bloom prefilter rejects almost every output with a few bit lookups and
+    the hits are confirmed against a packed sorted array of address hashes
+    (about 21 bytes per address instead of a set of strings).
+    Address hashes are blake2b/sha3 output already, so bloom positions are
+    taken from the hash bytes directly instead of hashing again.
+    """
+
+    def __init__(self, addresses: Iterable[str], rate: float = 0.001):
+        """
+        addresses: bech32 address strings
+        rate: false positive rate of the prefilter
+        """
+        assert 0 < rate < 1
+        grouped: Dict[int, List[bytes]] = {}
+        for address in addresses:
+            key = self.to_key(Address.from_string(address))
+            grouped.setdefault(len(key), []).append(key)
+        self.exact = {
+            width: _PackedKeys(keys, width) for width, keys in grouped.items()
+        }
+        items = max(1, sum(len(keys) for keys in self.exact.values()))
+        self.size = max(64, int(-items * math.log(rate) / math.log(2) ** 2))
+        self.n = max(1, round(self.size / items * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        for packed in self.exact.values():
+            for i in range(len(packed)):
+                for pos in self._positions(packed[i]):
+                    self.bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __len__(self) -> int:
+        return sum(len(packed) for packed in self.exact.values())
+
+    @staticmethod
+    def to_key(address: Address) -> bytes:
+        return bytes([address.version]) + bytes.fromhex(address.hash)
+
+    def _positions(self, key: bytes) -> List[int]:
+        size = self.size
+        pos = int.from_bytes(key[1:9], "little") % size
+        step = (int.from_bytes(key[9:17], "little") | 1) % size
+        return [(pos + i * step) % size for i in range(self.n)]
+
+    def maybe_contains(self, key: bytes) -> bool:
+        bits = self.bits
+        size = self.size
+        pos = int.from_bytes(key[1:9], "little") % size
+        step = (int.from_bytes(key[9:17], "little") | 1) % size
+        for _ in range(self.n):
+            if not bits[pos >> 3] & (1 << (pos & 7)):
+                return False
+            pos = (pos + step) % size
+        return True
+
+    def contains(self, key: bytes) -> bool:
+        if not self.maybe_contains(key):
+            return False
+        packed = self.exact.get(len(key))
+        return packed is not None and key in packed
+
+    def match_keys(self, keys: Sequence[bytes]) -> List[int]:
+        """
+        batch match, returns indexes of the matching keys
+        """
+        candidates = [i for i, key in enumerate(keys) if self.maybe_contains(key)]
+        exact = self.exact
+        return [
+            i
+            for i in candidates
+            if len(keys[i]) in exact and keys[i] in exact[len(keys[i])]
+        ]
+
+    def match_block(
+        self, block: Union[Block, Dict[str, Any]]
+    ) -> List[Tuple[int, int, Address]]:
+        """
+        Match every output of a block, returns (tx index, output index, address).
+        block is a decoded raw block (RpcClient.getblock_raw) or verbose JSON
+        (RpcClient.getblock(hash, 1, 1) or HttpClient.get_block_by_hash).
+        """
+        refs: List[Tuple[int, int]] = []
+        addresses: List[Address] = []
+        if isinstance(block, Block):
+            for tx_index, tx in enumerate(block.txs):
+                for output_index, output in enumerate(tx.outputs):
+                    refs.append((tx_index, output_index))
+                    addresses.append(output.address)
+        else:
+            txs = block.get("tx") or block.get("txs") or []
+            for tx_index, tx in enumerate(txs):
+                outputs = tx.get("vout") or tx.get("outputs") or []
+                for output_index, output in enumerate(outputs):
+                    refs.append((tx_index, output_index))
+                    addresses.append(json_address(output["address"]))
+        keys = [self.to_key(address) for address in addresses]
+        return [refs[i] + (addresses[i],) for i in self.match_keys(keys)]
+
+
+def json_address(address: Union[str, Dict[str, Any]]) -> Address:
+    """
+    RPC JSON has {"version", "hash"}, REST JSON has the bech32 string
+    """
+    if isinstance(address, dict):
+        return Address(address["version"], address["hash"])
+    return Address.from_string(address)
@@ -0,0 +1,216 @@
+import struct
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+from handshake_client.chain import ChainEntry
+from handshake_client.errors import VerifyError
+from handshake_client.primitives import Buffer, BufferReader, BlockHeader, blake256
+
+
+# bcrypto mrkl with blake2b-256, as used for the block merkleRoot
+LEAF_PREFIX = b"\x00"
+INTERNAL_PREFIX = b"\x01"
+# right hand node of an odd level
+EMPTY_HASH = blake256(b"")
+
+# no block can hold more transactions than this (1MB base size / 60 bytes)
+MAX_PROOF_TXS = 1000000 // 60
+
+
+def hash_leaf(data: Buffer) -> bytes:
+    return blake256(LEAF_PREFIX, data)
+
+
+def hash_internal(left: Buffer, right: Buffer) -> bytes:
+    return blake256(INTERNAL_PREFIX, left, right)
+
+
+def merkle_root(txids: List[str]) -> str:
+    """
+    merkleRoot of a block from its txids, see primitives.Transaction.hash
+    """
+    nodes = [hash_leaf(bytes.fromhex(txid)) for txid in txids]
+    if not nodes:
+        return EMPTY_HASH.hex()
+    while len(nodes) > 1:
+        if len(nodes) % 2:
+            nodes.append(EMPTY_HASH)
+        nodes = [hash_internal(nodes[i], nodes[i + 1]) for i in range(0, len(nodes), 2)]
+    return nodes[0].hex()
+
+
+@dataclass()
+class MerkleProof:
+    """
+    gettxoutproof result (hsd MerkleBlock): the block header followed by the
+    partial merkle tree. Hashes at the leaf level are txids.
+    """
+
+    header: BlockHeader
+    total: int
+    hashes: List[bytes]
+    flags: bytes
+
+    @classmethod
+    def read(cls, br: BufferReader) -> "MerkleProof":
+        header = BlockHeader.read(br)
+        total = br.read_u32()
+        count = br.read_varint()
+        if count > br.left() // 32:
+            raise VerifyError("merkle proof: bad hash count")
+        hashes = [bytes(br.read_bytes(32)) for _ in range(count)]
+        flags = bytes(br.read_var_bytes())
+        return cls(header, total, hashes, flags)
+
+    @classmethod
+    def from_raw(cls, buffer: Buffer) -> "MerkleProof":
+        """
+        create dataclass from gettxoutproof data
+        """
+        try:
+            return cls.read(BufferReader(buffer))
+        except (ValueError, struct.error) as e:
+            raise VerifyError(f"merkle proof: truncated ({e})")
+
+
+@dataclass()
+class ProofMatch:
+    block_hash: str
+    # matched txids and their position in the block
+    txids: List[str]
+    indexes: List[int]
+
+
+class MerkleVerifier:
+    """
+    Verify gettxoutproof results locally against a trusted header, without
+    asking (and trusting) the node that made the proof.
+    Proofs of the same block share most of their upper tree, so internal node
+    hashes are cached by their children and computed once per batch.
+    """
+
+    def __init__(self, max_cache: int = 100000):
+        self.max_cache = max_cache
+        self.cache: Dict[bytes, bytes] = {}
+
+    def _internal(self, left: bytes, right: bytes) -> bytes:
+        key = left + right
+        value = self.cache.get(key)
+        if value is None:
+            if len(self.cache) >= self.max_cache:
+                self.cache.clear()
+            value = self.cache[key] = hash_internal(left, right)
+        return value
+
+    def extract(self, proof: MerkleProof) -> Tuple[bytes, List[str], List[int]]:
+        """
+        walk the partial tree, returns (root, matched txids, indexes)
+        same checks as hsd MerkleBlock.extractTree, raises VerifyError
+        """
+        total = proof.total
+        hashes = proof.hashes
+        flags = proof.flags
+        if total == 0 or total > MAX_PROOF_TXS:
+            raise VerifyError("merkle proof: bad tx count")
+        if len(hashes) > total:
+            raise VerifyError("merkle proof: too many hashes")
+        if len(flags) * 8 < len(hashes):
+            raise VerifyError("merkle proof: too few flags")
+
+        height = 0
+        while (total + (1 << height) - 1) >> height > 1:
+            height += 1
+
+        matches: List[str] = []
+        indexes: List[int] = []
+        bits_used = 0
+        hash_used = 0
+
+        def traverse(height: int, pos: int) -> bytes:
+            nonlocal bits_used, hash_used
+            if bits_used >= len(flags) * 8:
+                raise VerifyError("merkle proof: out of flags")
+            parent = (flags[bits_used >> 3] >> (bits_used & 7)) & 1
+            bits_used += 1
+            if height == 0 or not parent:
+                if hash_used >= len(hashes):
+                    raise VerifyError("merkle proof: out of hashes")
+                node = hashes[hash_used]
+                hash_used += 1
+                if height == 0:
+                    if parent:
+                        matches.append(node.hex())
+                        indexes.append(pos)
+                    return hash_leaf(node)
+                return node
+            left = traverse(height - 1, pos * 2)
+            width = (total + (1 << (height - 1)) - 1) >> (height - 1)
+            if pos * 2 + 1 < width:
+                right = traverse(height - 1, pos * 2 + 1)
+                if right == left:
+                    raise VerifyError("merkle proof: duplicate node")
+            else:
+                right = EMPTY_HASH
+            return self._internal(left, right)
+
+        root = traverse(height, 0)
+        if (bits_used + 7) // 8 != len(flags):
+            raise VerifyError("merkle proof: unused flags")
+        if hash_used != len(hashes):
+            raise VerifyError("merkle proof: unused hashes")
+        return root, matches, indexes
+
+    def verify(
+        self,
+        proof: Union[MerkleProof, Buffer],
+        trusted: Optional[Union[BlockHeader, ChainEntry]] = None,
+    ) -> ProofMatch:
+        """
+        trusted: header from our own chain (headers.HeaderSync, a chain connect
+                 entry, ...). None only checks the proof against its own header.
+        """
+        if not isinstance(proof, MerkleProof):
+            proof = MerkleProof.from_raw(proof)
+        header = proof.header
+        if trusted is not None:
+            if trusted.hash != header.hash:
+                raise VerifyError("merkle proof: block hash does not match")
+            if trusted.merkleRoot != header.merkleRoot:
+                raise VerifyError("merkle proof: merkle root does not match")
+        root, txids, indexes = self.extract(proof)
+        if root.hex() != header.merkleRoot:
+            raise VerifyError("merkle proof: bad merkle root")
+        return ProofMatch(header.hash, txids, indexes)
+
+    def verify_batch(
+        self,
+        proofs: Iterable[Union[MerkleProof, Buffer]],
+        trusted: Optional[Dict[str, Union[BlockHeader, ChainEntry]]] = None,
+    ) -> List[Union[ProofMatch, VerifyError]]:
+        """
+        trusted: {block hash: header}, a proof for a block missing from it fails
+        returns a ProofMatch or the VerifyError for every proof, in order
+        """
+        results: List[Union[ProofMatch, VerifyError]] = []
+        for proof in proofs:
+            try:
+                if not isinstance(proof, MerkleProof):
+                    proof = MerkleProof.from_raw(proof)
+                header = None
+                if trusted is not None:
+                    header = trusted.get(proof.header.hash)
+                    if header is None:
+                        raise VerifyError("merkle proof: unknown block")
+                results.append(self.verify(proof, header))
+            except VerifyError as e:
+                results.append(e)
+        return results
+
+
+def verify_proof(
+    proof: Union[MerkleProof, Buffer],
+    trusted: Optional[Union[BlockHeader, ChainEntry]] = None,
+) -> List[str]:
+    """
+    matched txids of a single proof, raises VerifyError
+    """
+    return MerkleVerifier().verify(proof, trusted).txids
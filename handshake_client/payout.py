@@ -0,0 +1,186 @@
+import time
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+from handshake_client.errors import is_error
+from handshake_client.http_ import HttpClient, WalletHttpClient
+
+
+logger = logging.getLogger("handshake.payout")
+
+
+@dataclass()
+class PayoutResult:
+    address: str
+    value: int
+    # txid and output index of the payout, None on error
+    hash: Optional[str] = None
+    index: Optional[int] = None
+    error: Optional[Dict[str, Any]] = None
+
+
+Payout = Tuple[str, int, Future]
+
+
+class PayoutQueue:
+    """
+    Batch payouts into multi output transactions.
+    submit() returns a Future, outputs are collected for `window` seconds (or until
+    `max_batch` payouts are queued) and packed into transactions of at most
+    `max_outputs` outputs. Each transaction is built with create_transaction
+    and its inputs are locked with lock_outpoints under one lock, so builds run
+    one at a time and never pick the same coins. Broadcasts through the node run
+    in parallel.
+    """
+
+    def __init__(
+        self,
+        wallet: WalletHttpClient,
+        node: HttpClient,
+        passphrase: Optional[str] = None,
+        rate: Optional[int] = None,
+        window: float = 5.0,
+        max_batch: int = 1000,
+        max_outputs: int = 200,
+        workers: int = 4,
+    ):
+        """
+        rate: fee rate passed to create_transaction
+        """
+        assert passphrase is None or type(passphrase) == str
+        assert rate is None or type(rate) == int
+        assert type(max_batch) == int and max_batch > 0
+        assert type(max_outputs) == int and max_outputs > 0
+        self.wallet = wallet
+        self.node = node
+        self.passphrase = passphrase
+        self.rate = rate
+        self.window = window
+        self.max_batch = max_batch
+        self.max_outputs = max_outputs
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.build_lock = threading.Lock()
+        self.queue: List[Payout] = []
+        self.first_at = 0.0
+        self.closed = False
+        self.cond = threading.Condition()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def submit(self, address: str, value: int) -> "Future[PayoutResult]":
+        """
+        value: in dollarydoos
+        """
+        assert type(address) == str
+        assert type(value) == int and value > 0
+        future: Future = Future()
+        with self.cond:
+            if self.closed:
+                raise RuntimeError("payout queue is closed")
+            if not self.queue:
+                # starts the window
+                self.first_at = time.monotonic()
+                self.cond.notify()
+            self.queue.append((address, value, future))
+            if len(self.queue) >= self.max_batch:
+                self.cond.notify()
+        return future
+
+    def flush(self) -> None:
+        """
+        send everything queued now
+        """
+        with self.cond:
+            self.first_at = 0.0
+            self.cond.notify()
+
+    def close(self) -> None:
+        """
+        send what is queued and wait for it
+        """
+        with self.cond:
+            self.closed = True
+            self.cond.notify()
+        self.thread.join()
+        self.executor.shutdown()
+
+    def _run(self) -> None:
+        while True:
+            with self.cond:
+                while True:
+                    if self.queue:
+                        wait = self.first_at + self.window - time.monotonic()
+                        full = len(self.queue) >= self.max_batch
+                        if self.closed or full or wait <= 0:
+                            break
+                        self.cond.wait(wait)
+                    elif self.closed:
+                        return
+                    else:
+                        self.cond.wait()
+                batch = self.queue[: self.max_batch]
+                self.queue = self.queue[self.max_batch :]
+                self.first_at = time.monotonic()
+            for i in range(0, len(batch), self.max_outputs):
+                self.executor.submit(self._send, batch[i : i + self.max_outputs])
+
+    def _send(self, payouts: List[Payout]) -> None:
+        try:
+            self._build_and_broadcast(payouts)
+        except Exception as e:
+            logger.exception("payout batch failed")
+            self._fail(payouts, {"message": str(e)})
+
+    def _build_and_broadcast(self, payouts: List[Payout]) -> None:
+        outputs = [{"address": addr, "value": value} for addr, value, _ in payouts]
+        locked: List[Tuple[str, str]] = []
+        with self.build_lock:
+            tx = self.wallet.create_transaction(
+                outputs, self.passphrase, self.rate, sign=True
+            )
+            if is_error(tx):
+                self._fail(payouts, tx["error"])
+                return
+            try:
+                for tx_input in tx["inputs"]:
+                    tx_hash = tx_input["prevout"]["hash"]
+                    index = str(tx_input["prevout"]["index"])
+                    r = self.wallet.lock_outpoints(tx_hash, index, self.passphrase)
+                    if is_error(r):
+                        self._unlock(locked)
+                        self._fail(payouts, r["error"])
+                        return
+                    locked.append((tx_hash, index))
+            except Exception:
+                self._unlock(locked)
+                raise
+        r = self.node.broadcast_tx(tx["hex"])
+        if is_error(r):
+            self._unlock(locked)
+            self._fail(payouts, r["error"])
+            return
+        # outputs may be reordered by the wallet and get a change output
+        indexes: Dict[Tuple[str, int], List[int]] = {}
+        for index, output in enumerate(tx["outputs"]):
+            indexes.setdefault((output["address"], output["value"]), []).append(index)
+        for address, value, future in payouts:
+            found = indexes.get((address, value))
+            index = found.pop(0) if found else None
+            future.set_result(PayoutResult(address, value, tx["hash"], index))
+
+    def _unlock(self, locked: List[Tuple[str, str]]) -> None:
+        for tx_hash, index in locked:
+            try:
+                r = self.wallet.unlock_outpoints(tx_hash, index, self.passphrase)
+            except Exception as e:
+                r = {"error": {"message": str(e)}}
+            if is_error(r):
+                logger.warning(f"unlock {tx_hash}/{index}: {r['error']}")
+
+    @staticmethod
+    def _fail(payouts: List[Payout], error: Dict[str, Any]) -> None:
+        for address, value, future in payouts:
+            if not future.done():
+                future.set_result(PayoutResult(address, value, error=error))
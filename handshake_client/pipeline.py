@@ -0,0 +1,230 @@
+import re
+import time
+import queue
+import logging
+import threading
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional, Set
+from handshake_client.errors import is_error
+from handshake_client.primitives import Transaction
+
+
+logger = logging.getLogger("handshake.pipeline")
+
+# hsd reject reasons of a broadcast meaning the node already has the tx
+ALREADY_KNOWN = frozenset(("txn-already-in-mempool", "txn-already-known"))
+# hsd VerifyError message, ex.
+# "Verification failure: txn-already-in-mempool (code=alreadyknown score=0 hash=..)"
+REJECT_REASON = re.compile(r"Verification failure: (\S+) \(code=")
+# errors worth another try
+TRANSIENT = ("connection", "timed out", "timeout", "refused")
+
+
+@dataclass()
+class SubmitResult:
+    hash: str
+    # signed tx hex
+    hex: Optional[str] = None
+    error: Optional[Dict[str, Any]] = None
+
+
+class SubmitPipeline:
+    """
+    Sign and broadcast pre-built raw transactions.
+    Signing and broadcasting are separate stages with their own worker count,
+    connected by a bounded queue. A tx spending an output of another tx of the
+    same run is only signed after that parent was broadcast.
+    """
+
+    def __init__(
+        self,
+        sign: Callable[[str], Any],
+        broadcast: Callable[[str], Any],
+        sign_workers: int = 4,
+        broadcast_workers: int = 4,
+        queue_size: int = 64,
+        retries: int = 3,
+        retry_delay: float = 1.0,
+    ):
+        """
+        sign: raw tx hex -> {"hex": signed tx hex} or handshake Errors format
+        broadcast: signed tx hex -> result or handshake Errors format
+        """
+        assert type(sign_workers) == int and sign_workers > 0
+        assert type(broadcast_workers) == int and broadcast_workers > 0
+        assert type(queue_size) == int and queue_size > 0
+        self.sign = sign
+        self.broadcast = broadcast
+        self.sign_workers = sign_workers
+        self.broadcast_workers = broadcast_workers
+        self.queue_size = queue_size
+        self.retries = retries
+        self.retry_delay = retry_delay
+
+    @classmethod
+    def from_http(
+        cls, wallet: Any, node: Any, passphrase: Optional[str] = None, **kwargs: Any
+    ) -> "SubmitPipeline":
+        """
+        WalletHttpClient.sign_transaction + HttpClient.broadcast_tx
+        """
+        return cls(
+            lambda raw: wallet.sign_transaction(raw, passphrase),
+            node.broadcast_tx,
+            **kwargs,
+        )
+
+    @classmethod
+    def from_rpc(
+        cls,
+        rpc: Any,
+        inputs: List[Dict[str, Any]],
+        privkey_list: List[str],
+        **kwargs: Any,
+    ) -> "SubmitPipeline":
+        """
+        RpcClient.signrawtransaction + sendrawtransaction
+        inputs: see RpcClient.signrawtransaction
+        """
+        return cls(
+            lambda raw: rpc.signrawtransaction(raw, inputs, privkey_list),
+            rpc.sendrawtransaction,
+            **kwargs,
+        )
+
+    def run(self, raw_txs: Iterable[str]) -> Dict[str, SubmitResult]:
+        """
+        submit all transactions, returns txid -> SubmitResult
+        """
+        txs: Dict[str, str] = {}
+        parents: Dict[str, Set[str]] = {}
+        for raw in raw_txs:
+            tx = Transaction.from_raw(bytes.fromhex(raw))
+            txs[tx.hash] = raw
+            parents[tx.hash] = {i.prevout.hash for i in tx.inputs}
+        children: Dict[str, List[str]] = {txid: [] for txid in txs}
+        for txid in txs:
+            parents[txid] &= txs.keys()
+            parents[txid].discard(txid)
+            for parent in parents[txid]:
+                children[parent].append(txid)
+
+        results: Dict[str, SubmitResult] = {}
+        ready: Deque[str] = deque(txid for txid in txs if not parents[txid])
+        cond = threading.Condition()
+        sign_queue: "queue.Queue[Optional[str]]" = queue.Queue(self.queue_size)
+        broadcast_queue: "queue.Queue[Optional[SubmitResult]]" = queue.Queue(
+            self.queue_size
+        )
+
+        def finish(result: SubmitResult) -> None:
+            # runs on the workers, never blocks on the queues
+            failed = [result]
+            with cond:
+                while failed:
+                    current = failed.pop()
+                    results[current.hash] = current
+                    for child in children[current.hash]:
+                        if child in results:
+                            # already failed through another parent
+                            continue
+                        if current.error is not None:
+                            error = {"message": f"parent {current.hash} failed"}
+                            results[child] = SubmitResult(child, error=error)
+                            failed.append(results[child])
+                            continue
+                        parents[child].discard(current.hash)
+                        if not parents[child]:
+                            ready.append(child)
+                cond.notify_all()
+
+        def feeder() -> None:
+            while True:
+                with cond:
+                    while not ready and len(results) < len(txs):
+                        cond.wait()
+                    if not ready:
+                        break
+                    txid = ready.popleft()
+                sign_queue.put(txid)
+            for _ in range(self.sign_workers):
+                sign_queue.put(None)
+
+        def signer() -> None:
+            while True:
+                txid = sign_queue.get()
+                if txid is None:
+                    return
+                try:
+                    r = self._retry(self.sign, txs[txid])
+                    if not is_error(r) and r.get("complete") is False:
+                        r = {"error": {"message": "signature incomplete"}}
+                    if is_error(r):
+                        finish(SubmitResult(txid, error=r["error"]))
+                        continue
+                    signed = SubmitResult(txid, r["hex"])
+                except Exception as e:
+                    # ex. an unexpected response, the worker has to go on
+                    logger.exception(f"sign {txid}")
+                    finish(SubmitResult(txid, error={"message": repr(e)}))
+                    continue
+                broadcast_queue.put(signed)
+
+        def broadcaster() -> None:
+            while True:
+                item = broadcast_queue.get()
+                if item is None:
+                    return
+                try:
+                    r = self._retry(self.broadcast, item.hex)
+                    if is_error(r) and _reject_reason(r) not in ALREADY_KNOWN:
+                        item.error = r["error"]
+                except Exception as e:
+                    logger.exception(f"broadcast {item.hash}")
+                    item.error = {"message": repr(e)}
+                finish(item)
+
+        threads = [threading.Thread(target=feeder)]
+        signers = [threading.Thread(target=signer) for _ in range(self.sign_workers)]
+        broadcasters = [
+            threading.Thread(target=broadcaster)
+            for _ in range(self.broadcast_workers)
+        ]
+        for thread in threads + signers + broadcasters:
+            thread.start()
+        for thread in threads + signers:
+            thread.join()
+        for _ in broadcasters:
+            broadcast_queue.put(None)
+        for thread in broadcasters:
+            thread.join()
+        return results
+
+    def _retry(self, func: Callable[[str], Any], raw: str) -> Any:
+        for attempt in range(self.retries + 1):
+            try:
+                r = func(raw)
+            except Exception as e:
+                r = {"error": {"message": str(e)}}
+            if not is_error(r) or not _matches(r, TRANSIENT):
+                return r
+            if attempt < self.retries:
+                logger.info(f"retry after error: {r['error']}")
+                time.sleep(self.retry_delay * (attempt + 1))
+        return r
+
+
+def _message(result: Dict[str, Any]) -> str:
+    error = result["error"]
+    return error.get("message", "") if isinstance(error, dict) else str(error)
+
+
+def _matches(result: Dict[str, Any], words: Iterable[str]) -> bool:
+    message = _message(result).lower()
+    return any(word in message for word in words)
+
+
+def _reject_reason(result: Dict[str, Any]) -> Optional[str]:
+    match = REJECT_REASON.search(_message(result))
+    return match.group(1) if match else None
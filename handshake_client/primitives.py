@@ -0,0 +1,370 @@
+import struct
+from hashlib import blake2b, sha3_256
+from dataclasses import dataclass
+from typing import List, Tuple, Union
+from handshake_client.constant import COVENANT_TYPES
+
+
+Buffer = Union[bytes, bytearray, memoryview]
+
+_U32 = struct.Struct("<I")
+_U64 = struct.Struct("<Q")
+
+
+class BufferReader:
+    """
+    little endian reader over a memoryview
+    slices are memoryviews too, nothing is copied until hex/int conversion
+    """
+
+    def __init__(self, data: Buffer):
+        self.data = memoryview(data)
+        self.offset = 0
+
+    def left(self) -> int:
+        return len(self.data) - self.offset
+
+    def seek(self, size: int) -> None:
+        if self.offset + size > len(self.data):
+            raise ValueError("out of bounds read")
+        self.offset += size
+
+    def read_bytes(self, size: int) -> memoryview:
+        start = self.offset
+        self.seek(size)
+        return self.data[start : self.offset]
+
+    def read_hash(self) -> str:
+        return self.read_bytes(32).hex()
+
+    def read_u8(self) -> int:
+        self.seek(1)
+        return self.data[self.offset - 1]
+
+    def read_u16(self) -> int:
+        return int.from_bytes(self.read_bytes(2), byteorder="little")
+
+    def read_u32(self) -> int:
+        value = _U32.unpack_from(self.data, self.offset)[0]
+        self.seek(4)
+        return value
+
+    def read_u64(self) -> int:
+        value = _U64.unpack_from(self.data, self.offset)[0]
+        self.seek(8)
+        return value
+
+    def read_varint(self) -> int:
+        prefix = self.read_u8()
+        if prefix < 0xFD:
+            return prefix
+        if prefix == 0xFD:
+            return self.read_u16()
+        if prefix == 0xFE:
+            return self.read_u32()
+        return self.read_u64()
+
+    def read_var_bytes(self) -> memoryview:
+        return self.read_bytes(self.read_varint())
+
+
+def blake256(*chunks: Buffer) -> bytes:
+    h = blake2b(digest_size=32)
+    for chunk in chunks:
+        h.update(chunk)
+    return h.digest()
+
+
+@dataclass()
+class BlockHeader:
+    """
+    block header (236 bytes), same layout as the header part of ChainEntry
+    see https://hsd-dev.org/guides/blocks.html
+    """
+
+    hash: str
+    nonce: int
+    time: int
+    prevBlock: str
+    treeRoot: str
+    extraNonce: str
+    reservedRoot: str
+    witnessRoot: str
+    merkleRoot: str
+    version: int
+    bits: int
+    mask: str
+
+    SIZE = 236
+
+    @classmethod
+    def read(cls, br: BufferReader) -> "BlockHeader":
+        start = br.offset
+        nonce = br.read_u32()
+        time = br.read_u64()
+        prevBlock = br.read_bytes(32)
+        treeRoot = br.read_bytes(32)
+        extraNonce = br.read_bytes(24)
+        reservedRoot = br.read_hash()
+        witnessRoot = br.read_hash()
+        merkleRoot = br.read_hash()
+        version = br.read_u32()
+        bits = br.read_u32()
+        mask = br.read_bytes(32)
+        block_hash = pow_hash(
+            br.data[start : br.offset], prevBlock, treeRoot, mask
+        ).hex()
+        return cls(
+            block_hash,
+            nonce,
+            time,
+            prevBlock.hex(),
+            treeRoot.hex(),
+            extraNonce.hex(),
+            reservedRoot,
+            witnessRoot,
+            merkleRoot,
+            version,
+            bits,
+            mask.hex(),
+        )
+
+    @classmethod
+    def from_raw(cls, buffer: Buffer) -> "BlockHeader":
+        """
+        create dataclass from getblockheader(hash, 0) data
+        """
+        assert len(buffer) == cls.SIZE
+        return cls.read(BufferReader(buffer))
+
+    def verify_pow(self) -> bool:
+        """
+        check the header hash against its own bits target.
+        NOTE: difficulty retargeting is not checked
+        """
+        target = to_target(self.bits)
+        if target <= 0:
+            return False
+        return int(self.hash, 16) <= target
+
+
+def to_target(bits: int) -> int:
+    """
+    compact bits to target, returns -1 for negative or overflowing targets
+    """
+    exponent = bits >> 24
+    mantissa = bits & 0x7FFFFF
+    if exponent <= 3:
+        target = mantissa >> (8 * (3 - exponent))
+    else:
+        target = mantissa << (8 * (exponent - 3))
+    if bits & 0x800000 and mantissa != 0:
+        return -1
+    if target >= 1 << 256:
+        return -1
+    return target
+
+
+def pow_hash(
+    raw: memoryview, prev_block: Buffer, tree_root: Buffer, mask: Buffer
+) -> bytes:
+    """
+    handshake header hash from the 236 bytes header
+    see hsd lib/primitives/abstractblock.js
+    """
+    # nonce(4) time(8) | prevBlock treeRoot | extraNonce .. bits | mask
+    sub_hash = blake256(raw[76:204])
+    mask_hash = blake256(prev_block, mask)
+    commit_hash = blake256(sub_hash, mask_hash)
+    pad = bytes(prev_block[i % 32] ^ tree_root[i % 32] for i in range(32))
+    prehead = b"".join((raw[:12], pad[:20], prev_block, tree_root, commit_hash))
+    left = blake2b(prehead, digest_size=64).digest()
+    right = sha3_256(prehead + pad[:8]).digest()
+    share_hash = blake256(left, pad, right)
+    return bytes(a ^ b for a, b in zip(share_hash, mask))
+
+
+@dataclass()
+class Outpoint:
+    hash: str
+    index: int
+
+
+@dataclass()
+class Input:
+    prevout: Outpoint
+    sequence: int
+    witness: List[str]
+
+
+@dataclass()
+class Address:
+    version: int
+    hash: str
+
+    def to_string(self, hrp: str = "hs") -> str:
+        """
+        bech32 address string, hrp ex. 'hs'(main), 'rs'(regtest)
+        """
+        data = [self.version] + convert_bits(bytes.fromhex(self.hash), 8, 5, True)
+        return bech32_encode(hrp, data)
+
+    @classmethod
+    def from_string(cls, address: str) -> "Address":
+        _, data = bech32_decode(address)
+        if not data:
+            raise ValueError(f"invalid address {address}")
+        return cls(data[0], bytes(convert_bits(data[1:], 5, 8, False)).hex())
+
+
+BECH32_CHARSET = "qpzry9x8gf2tvdw0s3jn54khce6mua7l"
+
+
+def bech32_polymod(values: List[int]) -> int:
+    generator = [0x3B6A57B2, 0x26508E6D, 0x1EA119FA, 0x3D4233DD, 0x2A1462B3]
+    chk = 1
+    for value in values:
+        top = chk >> 25
+        chk = (chk & 0x1FFFFFF) << 5 ^ value
+        for i in range(5):
+            chk ^= generator[i] if ((top >> i) & 1) else 0
+    return chk
+
+
+def bech32_hrp_expand(hrp: str) -> List[int]:
+    return [ord(x) >> 5 for x in hrp] + [0] + [ord(x) & 31 for x in hrp]
+
+
+def bech32_encode(hrp: str, data: List[int]) -> str:
+    values = bech32_hrp_expand(hrp) + data
+    polymod = bech32_polymod(values + [0] * 6) ^ 1
+    checksum = [(polymod >> 5 * (5 - i)) & 31 for i in range(6)]
+    return hrp + "1" + "".join(BECH32_CHARSET[d] for d in data + checksum)
+
+
+def bech32_decode(address: str) -> Tuple[str, List[int]]:
+    """
+    returns (hrp, data without checksum), data is empty when invalid
+    """
+    address = address.lower()
+    pos = address.rfind("1")
+    if pos < 1 or pos + 7 > len(address) or len(address) > 90:
+        return "", []
+    hrp = address[:pos]
+    try:
+        data = [BECH32_CHARSET.index(c) for c in address[pos + 1 :]]
+    except ValueError:
+        return "", []
+    if bech32_polymod(bech32_hrp_expand(hrp) + data) != 1:
+        return "", []
+    return hrp, data[:-6]
+
+
+def convert_bits(data: Buffer, from_bits: int, to_bits: int, pad: bool) -> List[int]:
+    acc = 0
+    bits = 0
+    result: List[int] = []
+    maxv = (1 << to_bits) - 1
+    for value in data:
+        acc = (acc << from_bits) | value
+        bits += from_bits
+        while bits >= to_bits:
+            bits -= to_bits
+            result.append((acc >> bits) & maxv)
+    if pad and bits:
+        result.append((acc << (to_bits - bits)) & maxv)
+    return result
+
+
+@dataclass()
+class Covenant:
+    type: int
+    items: List[str]
+
+    @property
+    def action(self) -> str:
+        """
+        covenant name ex. 'OPEN', 'BID'
+        """
+        if self.type < len(COVENANT_TYPES):
+            return COVENANT_TYPES[self.type]
+        return "UNKNOWN"
+
+
+@dataclass()
+class Output:
+    value: int
+    address: Address
+    covenant: Covenant
+
+
+@dataclass()
+class Transaction:
+    """
+    hash is the txid (without witness), witnessHash includes witness data
+    """
+
+    hash: str
+    witnessHash: str
+    version: int
+    inputs: List[Input]
+    outputs: List[Output]
+    locktime: int
+
+    @classmethod
+    def read(cls, br: BufferReader) -> "Transaction":
+        start = br.offset
+        version = br.read_u32()
+        inputs: List[Input] = []
+        for _ in range(br.read_varint()):
+            prevout = Outpoint(br.read_hash(), br.read_u32())
+            inputs.append(Input(prevout, br.read_u32(), []))
+        outputs: List[Output] = []
+        for _ in range(br.read_varint()):
+            value = br.read_u64()
+            addr_version = br.read_u8()
+            address = Address(addr_version, br.read_bytes(br.read_u8()).hex())
+            covenant_type = br.read_u8()
+            items = [br.read_var_bytes().hex() for _ in range(br.read_varint())]
+            outputs.append(Output(value, address, Covenant(covenant_type, items)))
+        locktime = br.read_u32()
+        base_end = br.offset
+        for tx_input in inputs:
+            count = br.read_varint()
+            tx_input.witness = [br.read_var_bytes().hex() for _ in range(count)]
+        tx_hash = blake256(br.data[start:base_end])
+        witness_hash = blake256(tx_hash, blake256(br.data[base_end : br.offset]))
+        return cls(
+            tx_hash.hex(), witness_hash.hex(), version, inputs, outputs, locktime,
+        )
+
+    @classmethod
+    def from_raw(cls, buffer: Buffer) -> "Transaction":
+        """
+        create dataclass from getrawtransaction(hash, 0) data
+        """
+        br = BufferReader(buffer)
+        tx = cls.read(br)
+        assert br.left() == 0
+        return tx
+
+
+@dataclass()
+class Block:
+    header: BlockHeader
+    txs: List[Transaction]
+
+    @property
+    def hash(self) -> str:
+        return self.header.hash
+
+    @classmethod
+    def from_raw(cls, buffer: Buffer) -> "Block":
+        """
+        create dataclass from getblock(hash, 0) data
+        """
+        br = BufferReader(buffer)
+        header = BlockHeader.read(br)
+        txs = [Transaction.read(br) for _ in range(br.read_varint())]
+        assert br.left() == 0
+        return cls(header, txs)
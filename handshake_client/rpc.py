@@ -1,9 +1,45 @@
 import json
+import functools
+import threading
+from contextlib import contextmanager
 from decimal import Decimal
-from typing import Optional, Union, List, Dict, Any
-from bitcoinrpc.authproxy import AuthServiceProxy, JSONRPCException
+from typing import (
+    Optional,
+    Union,
+    List,
+    Dict,
+    Any,
+    Callable,
+    Iterator,
+    Tuple,
+    TYPE_CHECKING,
+)
+from handshake_client.compression import accept_encoding, read_response
 from handshake_client.constant import TIMEOUT, COMMANDS
 
+if TYPE_CHECKING:
+    from requests import Session
+    from handshake_client.limiter import AdaptiveLimiter
+    from handshake_client.merkle import MerkleProof
+    from handshake_client.primitives import Block, BlockHeader, Transaction
+
+
+# client methods that are not a single rpc_call, see RpcBatch
+_NOT_BATCHED = frozenset(("rpc_batch", "batch", "close", "getnewaddresses", "execute"))
+# selectwallet is server wide, see WalletRpcClient
+_SELECT_GATES: Dict[str, "_SelectGate"] = {}
+_SELECT_GATES_LOCK = threading.Lock()
+
+
+def _rpc_error(error: Any) -> Dict[str, Any]:
+    """
+    JSON-RPC error object to the handshake Errors format, same message as
+    bitcoinrpc's JSONRPCException
+    """
+    if not isinstance(error, dict):
+        return {"error": {"message": str(error)}}
+    return {"error": {"message": f"{error.get('message')} ({error.get('code')})"}}
+
 
 class RpcClient:
     """
@@ -19,7 +55,17 @@ class RpcClient:
         user: str = "x",
         ssl: bool = False,
         timeout: int = TIMEOUT,
+        limiter: Optional["AdaptiveLimiter"] = None,
+        transport: Any = None,
+        compression: bool = False,
     ):
+        """
+        limiter: limiter.AdaptiveLimiter shared by the clients of one node
+        transport: transport.Recorder or transport.Replayer, default is the network
+        compression: send calls with requests and ask for compressed responses
+                     (see compression.py) instead of the bare bitcoinrpc
+                     connection, worth it for big results over a slow link
+        """
         assert type(api_key) == str
         assert type(host) == str
         assert type(port) == str
@@ -30,15 +76,181 @@ class RpcClient:
         if ssl is True:
             schema = "https"
         self.url = f"{schema}://{user}:{api_key}@{host}:{port}"
+        self.timeout = timeout
+        self.limiter = limiter
+        self.transport = transport
+        self.compression = compression
+        # calls per batch request, see rpc_batch
+        self.max_batch = 1000
 
     def rpc_call(self, method: str, *args) -> Any:
         assert type(method) == str
+        if self.limiter is None:
+            return self._exchange(method, args)[0]
+        with self.limiter.slot(method) as permit:
+            r, permit.dropped = self._exchange(method, args)
+        return r
+
+    def _exchange(self, method: str, args: Tuple[Any, ...]) -> Tuple[Any, bool]:
+        if self.transport is None:
+            return self._send(method, args)
+        return self.transport.send_rpc(self._send, self.url, method, args)
+
+    def _send(self, method: str, args: Tuple[Any, ...]) -> Tuple[Any, bool]:
+        """
+        (response, True when the node looked overloaded)
+        JSONRPCException is an answer from the node and does not count.
+        """
+        if self.compression:
+            return self._send_compressed(method, args)
+        # imported here so that importing the package does not load bitcoinrpc
+        from bitcoinrpc.authproxy import AuthServiceProxy, JSONRPCException
+
         try:
             r = AuthServiceProxy(self.url, method).__call__(*args)
-            return r
-        except (ConnectionRefusedError, JSONRPCException) as e:
+            return r, False
+        except ConnectionRefusedError as e:
+            # return handshake Errors format
+            return {"error": {"message": str(e)}}, True
+        except JSONRPCException as e:
+            return {"error": {"message": str(e)}}, False
+
+    def _http(self) -> Any:
+        import requests
+
+        return requests
+
+    def _post(self, payload: Any) -> Any:
+        accept = accept_encoding() if self.compression else "identity"
+        # Decimal arguments as numbers, like bitcoinrpc
+        body = json.dumps(payload, default=float)
+        return self._http().post(
+            self.url,
+            data=body,
+            headers={"Content-Type": "application/json", "Accept-Encoding": accept},
+            timeout=self.timeout,
+            stream=True,
+        )
+
+    def _send_compressed(
+        self, method: str, args: Tuple[Any, ...]
+    ) -> Tuple[Any, bool]:
+        """
+        same results as the bitcoinrpc path (Decimal numbers, error format)
+        """
+        from requests.exceptions import ConnectionError
+
+        try:
+            r = self._post({"method": method, "params": args, "id": 1})
+            body = read_response(r)
+        except ConnectionError as e:
+            # return handshake Errors format
+            return {"error": {"message": str(e)}}, True
+        try:
+            data = json.loads(body, parse_float=Decimal)
+            error, result = data["error"], data["result"]
+        except (ValueError, TypeError, KeyError):
+            message = f"{r.status_code} {r.reason}"
+            return {"error": {"message": message}}, r.status_code >= 500
+        if error:
+            return _rpc_error(error), False
+        return result, False
+
+    def _send_batch(
+        self, calls: List[Tuple[str, List[Any]]]
+    ) -> Tuple[List[Any], bool]:
+        """
+        (result or error of each call, True when the node looked overloaded)
+        """
+        from requests.exceptions import ConnectionError
+
+        payload: List[Dict[str, Any]] = [
+            {"method": method, "params": params, "id": i}
+            for i, (method, params) in enumerate(calls)
+        ]
+        try:
+            r, body = self._post_batch(payload)
+        except ConnectionError as e:
+            # return handshake Errors format
+            return [{"error": {"message": str(e)}} for _ in calls], True
+        overloaded = r.status_code >= 500
+        try:
+            data = json.loads(body, parse_float=Decimal)
+        except ValueError:
+            message = f"{r.status_code} {r.reason}"
+            return [{"error": {"message": message}} for _ in calls], overloaded
+        if not isinstance(data, list):
+            # the whole request was refused, ex. bad api key
+            error = data.get("error") if isinstance(data, dict) else None
+            error = error or f"{r.status_code} {r.reason}"
+            return [_rpc_error(error) for _ in calls], overloaded
+        responses = {item.get("id"): item for item in data if isinstance(item, dict)}
+        selected = responses.get("select")
+        if selected is not None and selected.get("error"):
+            return [_rpc_error(selected["error"]) for _ in calls], False
+        results: List[Any] = []
+        for i in range(len(calls)):
+            item = responses.get(i)
+            if item is None:
+                results.append({"error": {"message": "no response"}})
+            elif item.get("error"):
+                results.append(_rpc_error(item["error"]))
+            else:
+                results.append(item.get("result"))
+        return results, overloaded
+
+    def _exchange_batch(
+        self, calls: List[Tuple[str, List[Any]]]
+    ) -> Tuple[List[Any], bool]:
+        if self.transport is None:
+            return self._send_batch(calls)
+        # recorded as one call of the "batch" pseudo method
+        return self.transport.send_rpc(
+            lambda _, args: self._send_batch(args[0]), self.url, "batch", (calls,)
+        )
+
+    def _post_batch(self, payload: List[Dict[str, Any]]) -> Tuple[Any, bytes]:
+        """
+        (response, body), WalletRpcClient adds its selectwallet here
+        """
+        r = self._post(payload)
+        return r, read_response(r)
+
+    def rpc_batch(self, calls: List[Tuple[str, List[Any]]]) -> List[Any]:
+        """
+        calls: (method, params) pairs, sent max_batch at a time
+        returns the result (or handshake Errors format) of every call, in order
+        """
+        results: List[Any] = []
+        for i in range(0, len(calls), self.max_batch):
+            chunk = calls[i : i + self.max_batch]
+            if self.limiter is None:
+                r, _ = self._exchange_batch(chunk)
+            else:
+                with self.limiter.slot("batch") as permit:
+                    r, permit.dropped = self._exchange_batch(chunk)
+            results += r
+        return results
+
+    def batch(self) -> "RpcBatch":
+        return RpcBatch(self)
+
+    def rpc_call_raw(self, method: str, *args) -> bytes:
+        """
+        JSON-RPC response body without parsing it, for decoder.DecodePool.
+        Does not go through the limiter or transport.
+        """
+        assert type(method) == str
+        from requests.exceptions import ConnectionError
+
+        try:
+            # hsd answers rpc errors with a json body too, whatever the status
+            payload = {"method": method, "params": args, "id": 1}
+            return read_response(self._post(payload))
+        except ConnectionError as e:
             # return handshake Errors format
-            return {"error": {"message": str(e)}}
+            error = {"result": None, "error": {"message": str(e)}}
+            return json.dumps(error).encode()
 
     # RPC Calls - Node
     def stop(self) -> str:
@@ -139,12 +351,12 @@ class RpcClient:
         return self.rpc_call("getblock", block_hash, verbose, details)
 
     def getblockbyheight(
-        self, block_hash: str, verbose: int = 1, details: int = 0
+        self, height: int, verbose: int = 1, details: int = 0
     ) -> Union[str, Dict[str, Any]]:
-        assert type(block_hash) == str
+        assert type(height) == int
         assert type(verbose) == int
         assert type(details) == int
-        return self.rpc_call("getblockbyheight", block_hash, verbose, details)
+        return self.rpc_call("getblockbyheight", height, verbose, details)
 
     def getblockhash(self, height: int) -> str:
         assert type(height) == int
@@ -157,6 +369,28 @@ class RpcClient:
         assert type(verbose) == int
         return self.rpc_call("getblockheader", block_hash, verbose)
 
+    def getblock_raw(self, block_hash: str) -> Union["Block", Dict[str, Any]]:
+        """
+        getblock with verbose=0, decoded locally.
+        The raw encoding is much smaller than the verbose JSON.
+        """
+        from handshake_client.primitives import Block
+
+        r = self.getblock(block_hash, 0)
+        if isinstance(r, dict):
+            return r
+        return Block.from_raw(bytes.fromhex(r))
+
+    def getblockheader_raw(
+        self, block_hash: str
+    ) -> Union["BlockHeader", Dict[str, Any]]:
+        from handshake_client.primitives import BlockHeader
+
+        r = self.getblockheader(block_hash, 0)
+        if isinstance(r, dict):
+            return r
+        return BlockHeader.from_raw(bytes.fromhex(r))
+
     def getchaintips(self) -> List[Dict[str, Any]]:
         return self.rpc_call("getchaintips")
 
@@ -235,6 +469,16 @@ class RpcClient:
         assert type(verbose) == int
         return self.rpc_call("getrawtransaction", tx_hash, verbose)
 
+    def getrawtransaction_raw(
+        self, tx_hash: str
+    ) -> Union["Transaction", Dict[str, Any]]:
+        from handshake_client.primitives import Transaction
+
+        r = self.getrawtransaction(tx_hash, 0)
+        if isinstance(r, dict):
+            return r
+        return Transaction.from_raw(bytes.fromhex(r))
+
     def decoderawtransaction(self, raw_tx: str) -> Dict[str, Any]:
         assert type(raw_tx) == str
         return self.rpc_call("decoderawtransaction", raw_tx)
@@ -288,7 +532,7 @@ class RpcClient:
         """
         assert type(raw_tx) == str
         assert type(inputs) == list
-        assert type(privkey_list) == str
+        assert type(privkey_list) == list
         assert type(sighashtype) == int
         return self.rpc_call("signrawtransaction", raw_tx, inputs, privkey_list, sighashtype)
 
@@ -299,6 +543,21 @@ class RpcClient:
         assert block_hash is None or type(block_hash) == str
         return self.rpc_call("gettxoutproof", txid_list, block_hash)
 
+    def gettxoutproof_raw(
+        self, txid_list: List[str], block_hash: Optional[str] = None
+    ) -> Union["MerkleProof", Dict[str, Any]]:
+        """
+        gettxoutproof decoded locally, check it with merkle.MerkleVerifier
+        instead of verifytxoutproof
+        """
+        from handshake_client.merkle import MerkleProof
+
+        args = [txid_list] if block_hash is None else [txid_list, block_hash]
+        r = self.gettxoutproof(*args)
+        if isinstance(r, dict):
+            return r
+        return MerkleProof.from_raw(bytes.fromhex(r))
+
     def verifytxoutproof(self, proof: str) -> List[str]:
         assert type(proof) == str
         return self.rpc_call("verifytxoutproof", proof)
@@ -521,3 +780,424 @@ class RpcClient:
         assert type(address) == str
         assert type(value) == float
         return self.rpc_call("importnonce", name, address, value)
+
+
+class RpcBatch:
+    """
+    Records calls of the client's methods instead of sending them: arguments
+    are checked as usual and each call returns its index. execute() sends the
+    queue with client.rpc_batch (limiter, transport and, for WalletRpcClient,
+    the wallet selection of the client) and returns the results in order.
+
+        batch = RpcBatch(rpc)
+        for height in range(100):
+            batch.getblockhash(height)
+        hashes = batch.execute()
+
+    The _raw methods parse their result and cannot be queued.
+    """
+
+    def __init__(self, client: RpcClient):
+        self.client = client
+        self.queue: List[Tuple[str, List[Any]]] = []
+
+    def rpc_call(self, method: str, *args) -> int:
+        assert type(method) == str
+        self.queue.append((method, list(args)))
+        return len(self.queue) - 1
+
+    def __getattr__(self, name: str) -> Callable[..., int]:
+        method = getattr(type(self.client), name, None)
+        if (
+            method is None
+            or name.startswith("_")
+            or name.endswith("_raw")
+            or name in _NOT_BATCHED
+        ):
+            raise AttributeError(f"{name} cannot be batched")
+        # the client's method with this batch as self, its rpc_call queues
+        return functools.partial(method, self)
+
+    def execute(self) -> List[Any]:
+        queue, self.queue = self.queue, []
+        if not queue:
+            return []
+        return self.client.rpc_batch(queue)
+
+
+class _SelectGate:
+    """
+    One per wallet server. Requests that select the same wallet run together,
+    a request selecting another wallet waits until they are answered.
+    """
+
+    def __init__(self) -> None:
+        self.cond = threading.Condition()
+        self.wallet_id: Optional[str] = None
+        self.inflight = 0
+        # requests waiting for another wallet, they go before new requests
+        # selecting the current one
+        self.waiting = 0
+
+    @contextmanager
+    def selected(self, wallet_id: str) -> Iterator[None]:
+        with self.cond:
+            if self.inflight and (self.wallet_id != wallet_id or self.waiting):
+                self.waiting += 1
+                while self.inflight:
+                    self.cond.wait()
+                self.waiting -= 1
+            self.wallet_id = wallet_id
+            self.inflight += 1
+        try:
+            yield
+        finally:
+            with self.cond:
+                self.inflight -= 1
+                if not self.inflight:
+                    self.cond.notify_all()
+
+
+def _select_gate(server: str) -> _SelectGate:
+    with _SELECT_GATES_LOCK:
+        return _SELECT_GATES.setdefault(server, _SelectGate())
+
+
+class WalletRpcClient(RpcClient):
+    """
+    hsw wallet JSON-RPC (ex. mainnet port 12039), the Wallet Auctions calls of
+    RpcClient work here too.
+    see https://hsd-dev.org/api-docs/index.html?shell--cli#rpc-calls-wallet
+    All calls go over one keep-alive requests.Session. batch() queues calls
+    and sends them as JSON-RPC batch requests of up to max_batch calls:
+
+        wallet = WalletRpcClient(api_key, "127.0.0.1", "12039", wallet_id="hot")
+        batch = wallet.batch()
+        for _ in range(5000):
+            batch.getnewaddress("default")
+        addresses = batch.execute()  # 5 requests
+
+    NOTE: selectwallet is server wide in hsw, another connection can select a
+    different wallet between our selectwallet and the calls after it. With
+    wallet_id set every request starts with its own selectwallet, and the
+    WalletRpcClients of this process only send requests selecting different
+    wallets to the same server one after another (requests selecting the same
+    wallet go in parallel), but other processes (hsw-cli, other apps) can
+    still switch the wallet in between. When anything else uses the wallet rpc, send and
+    sign with WalletHttpClient, its paths name the wallet.
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        host: str,
+        port: str,
+        user: str = "x",
+        ssl: bool = False,
+        timeout: int = TIMEOUT,
+        limiter: Optional["AdaptiveLimiter"] = None,
+        transport: Any = None,
+        compression: bool = False,
+        wallet_id: Optional[str] = None,
+        session: Optional["Session"] = None,
+        max_batch: int = 1000,
+    ):
+        """
+        wallet_id: wallet to select, None keeps the server's (primary by default)
+        session: shared requests.Session, default is one per client
+        max_batch: calls per batch request
+        """
+        assert wallet_id is None or type(wallet_id) == str
+        assert type(max_batch) == int and max_batch > 0
+        super().__init__(
+            api_key, host, port, user, ssl, timeout, limiter, transport, compression
+        )
+        self.wallet_id = wallet_id
+        self.session = session
+        self.max_batch = max_batch
+        self.select_gate = _select_gate(f"{host}:{port}")
+
+    def _http(self) -> Any:
+        if self.session is None:
+            from requests import Session
+
+            self.session = Session()
+        return self.session
+
+    def _send(self, method: str, args: Tuple[Any, ...]) -> Tuple[Any, bool]:
+        results, overloaded = self._send_batch([(method, list(args))])
+        return results[0], overloaded
+
+    def _post_batch(self, payload: List[Dict[str, Any]]) -> Tuple[Any, bytes]:
+        if self.wallet_id is None:
+            return super()._post_batch(payload)
+        select = {"method": "selectwallet", "params": [self.wallet_id]}
+        payload = [dict(select, id="select")] + payload
+        with self.select_gate.selected(self.wallet_id):
+            r = self._post(payload)
+        # hsd answers once every call ran, the body is read outside the gate
+        return r, read_response(r)
+
+    def close(self) -> None:
+        if self.session is not None:
+            self.session.close()
+
+    # Bulk
+    def getnewaddresses(
+        self, count: int, account: str = "default"
+    ) -> List[Union[str, Dict[str, Any]]]:
+        """
+        derive count addresses in count / max_batch round trips
+        """
+        assert type(count) == int
+        assert type(account) == str
+        return self.rpc_batch([("getnewaddress", [account])] * count)
+
+    # RPC Calls - Wallet
+    def selectwallet(self, wallet_id: str) -> None:
+        """
+        NOTE: prefer the wallet_id argument, see the class docstring
+        """
+        assert type(wallet_id) == str
+        return self.rpc_call("selectwallet", wallet_id)
+
+    def getwalletinfo(self) -> Dict[str, Any]:
+        return self.rpc_call("getwalletinfo")
+
+    def getbalance(
+        self, account: str = "*", minconf: int = 0, watch_only: bool = False
+    ) -> Decimal:
+        assert type(account) == str
+        assert type(minconf) == int
+        assert type(watch_only) == bool
+        return self.rpc_call("getbalance", account, minconf, watch_only)
+
+    def getunconfirmedbalance(self) -> Decimal:
+        return self.rpc_call("getunconfirmedbalance")
+
+    def getnewaddress(self, account: str = "default") -> str:
+        assert type(account) == str
+        return self.rpc_call("getnewaddress", account)
+
+    def getrawchangeaddress(self) -> str:
+        return self.rpc_call("getrawchangeaddress")
+
+    def getaccountaddress(self, account: str) -> str:
+        assert type(account) == str
+        return self.rpc_call("getaccountaddress", account)
+
+    def getaccount(self, address: str) -> str:
+        assert type(address) == str
+        return self.rpc_call("getaccount", address)
+
+    def getaddressesbyaccount(self, account: str) -> List[str]:
+        assert type(account) == str
+        return self.rpc_call("getaddressesbyaccount", account)
+
+    def listaccounts(
+        self, minconf: int = 0, watch_only: bool = False
+    ) -> Dict[str, Any]:
+        assert type(minconf) == int
+        assert type(watch_only) == bool
+        return self.rpc_call("listaccounts", minconf, watch_only)
+
+    def listunspent(
+        self,
+        minconf: int = 1,
+        maxconf: int = 9999999,
+        addresses: Optional[List[str]] = None,
+    ) -> List[Dict[str, Any]]:
+        assert type(minconf) == int
+        assert type(maxconf) == int
+        assert addresses is None or type(addresses) == list
+        if addresses is None:
+            return self.rpc_call("listunspent", minconf, maxconf)
+        return self.rpc_call("listunspent", minconf, maxconf, addresses)
+
+    def listtransactions(
+        self,
+        account: str = "*",
+        count: int = 10,
+        from_: int = 0,
+        watch_only: bool = False,
+    ) -> List[Dict[str, Any]]:
+        assert type(account) == str
+        assert type(count) == int
+        assert type(from_) == int
+        assert type(watch_only) == bool
+        return self.rpc_call("listtransactions", account, count, from_, watch_only)
+
+    def listsinceblock(
+        self,
+        block_hash: Optional[str] = None,
+        target_confirmations: int = 0,
+        watch_only: bool = False,
+    ) -> Dict[str, Any]:
+        assert block_hash is None or type(block_hash) == str
+        assert type(target_confirmations) == int
+        assert type(watch_only) == bool
+        return self.rpc_call(
+            "listsinceblock", block_hash, target_confirmations, watch_only
+        )
+
+    def gettransaction(self, tx_hash: str, watch_only: bool = False) -> Dict[str, Any]:
+        assert type(tx_hash) == str
+        assert type(watch_only) == bool
+        return self.rpc_call("gettransaction", tx_hash, watch_only)
+
+    def getreceivedbyaddress(self, address: str, minconf: int = 0) -> Decimal:
+        assert type(address) == str
+        assert type(minconf) == int
+        return self.rpc_call("getreceivedbyaddress", address, minconf)
+
+    def getreceivedbyaccount(self, account: str, minconf: int = 0) -> Decimal:
+        assert type(account) == str
+        assert type(minconf) == int
+        return self.rpc_call("getreceivedbyaccount", account, minconf)
+
+    def listreceivedbyaddress(
+        self, minconf: int = 0, include_empty: bool = False, watch_only: bool = False
+    ) -> List[Dict[str, Any]]:
+        assert type(minconf) == int
+        assert type(include_empty) == bool
+        assert type(watch_only) == bool
+        return self.rpc_call(
+            "listreceivedbyaddress", minconf, include_empty, watch_only
+        )
+
+    def sendtoaddress(
+        self,
+        address: str,
+        amount: float,
+        comment: Optional[str] = None,
+        comment_to: Optional[str] = None,
+        subtract_fee: bool = False,
+    ) -> str:
+        """
+        amount: HNS
+        return: transaction hash
+        """
+        assert type(address) == str
+        assert type(amount) == float
+        assert type(subtract_fee) == bool
+        return self.rpc_call(
+            "sendtoaddress", address, amount, comment, comment_to, subtract_fee
+        )
+
+    def sendfrom(
+        self, account: str, address: str, amount: float, minconf: int = 0
+    ) -> str:
+        assert type(account) == str
+        assert type(address) == str
+        assert type(amount) == float
+        assert type(minconf) == int
+        return self.rpc_call("sendfrom", account, address, amount, minconf)
+
+    def sendmany(
+        self,
+        account: str,
+        outputs: Dict[str, float],
+        minconf: int = 1,
+        comment: Optional[str] = None,
+        subtract_fee: bool = False,
+    ) -> str:
+        """
+        outputs: {address: amount in HNS}, paid in one transaction
+        return: transaction hash
+        """
+        assert type(account) == str
+        assert type(outputs) == dict
+        assert type(minconf) == int
+        assert type(subtract_fee) == bool
+        return self.rpc_call(
+            "sendmany", account, outputs, minconf, comment, subtract_fee
+        )
+
+    def settxfee(self, rate: float) -> bool:
+        """
+        rate: HNS per kB
+        """
+        assert type(rate) == float
+        return self.rpc_call("settxfee", rate)
+
+    def abandontransaction(self, tx_hash: str) -> None:
+        assert type(tx_hash) == str
+        return self.rpc_call("abandontransaction", tx_hash)
+
+    def resendwallettransactions(self) -> List[str]:
+        return self.rpc_call("resendwallettransactions")
+
+    def lockunspent(
+        self, unlock: bool, outputs: Optional[List[Dict[str, Any]]] = None
+    ) -> bool:
+        """
+        outputs: [{"txid": hash, "vout": index}], None (un)locks all
+        """
+        assert type(unlock) == bool
+        assert outputs is None or type(outputs) == list
+        if outputs is None:
+            return self.rpc_call("lockunspent", unlock)
+        return self.rpc_call("lockunspent", unlock, outputs)
+
+    def listlockunspent(self) -> List[Dict[str, Any]]:
+        return self.rpc_call("listlockunspent")
+
+    def signmessage(self, address: str, message: str) -> str:
+        assert type(address) == str
+        assert type(message) == str
+        return self.rpc_call("signmessage", address, message)
+
+    def dumpprivkey(self, address: str) -> str:
+        assert type(address) == str
+        return self.rpc_call("dumpprivkey", address)
+
+    def importprivkey(
+        self, privkey: str, label: Optional[str] = None, rescan: bool = False
+    ) -> None:
+        assert type(privkey) == str
+        assert type(rescan) == bool
+        return self.rpc_call("importprivkey", privkey, label, rescan)
+
+    def importaddress(
+        self, address: str, label: Optional[str] = None, rescan: bool = False
+    ) -> None:
+        assert type(address) == str
+        assert type(rescan) == bool
+        return self.rpc_call("importaddress", address, label, rescan)
+
+    def importpubkey(
+        self, pubkey: str, label: Optional[str] = None, rescan: bool = False
+    ) -> None:
+        assert type(pubkey) == str
+        assert type(rescan) == bool
+        return self.rpc_call("importpubkey", pubkey, label, rescan)
+
+    def walletpassphrase(self, passphrase: str, timeout: int) -> None:
+        """
+        timeout: seconds until the wallet is locked again
+        """
+        assert type(passphrase) == str
+        assert type(timeout) == int
+        return self.rpc_call("walletpassphrase", passphrase, timeout)
+
+    def walletlock(self) -> None:
+        return self.rpc_call("walletlock")
+
+    def walletpassphrasechange(self, old: str, new: str) -> None:
+        assert type(old) == str
+        assert type(new) == str
+        return self.rpc_call("walletpassphrasechange", old, new)
+
+    def encryptwallet(self, passphrase: str) -> str:
+        assert type(passphrase) == str
+        return self.rpc_call("encryptwallet", passphrase)
+
+    def backupwallet(self, path: str) -> None:
+        assert type(path) == str
+        return self.rpc_call("backupwallet", path)
+
+    def keypoolrefill(self) -> None:
+        return self.rpc_call("keypoolrefill")
+
+    def getnames(self) -> List[Dict[str, Any]]:
+        return self.rpc_call("getnames")
@@ -1,14 +1,44 @@
 import logging
-import socketio
+from typing import Any, Optional, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import socketio
 
 
 logger = logging.getLogger("handshake.socket")
-sio = socketio.AsyncClient(logger=logger)
+_sio: Optional["socketio.AsyncClient"] = None
+
+
+def get_sio() -> "socketio.AsyncClient":
+    """
+    The shared socket client, socketio (and aiohttp) are imported on first use.
+    """
+    global _sio
+    if _sio is None:
+        import socketio
+
+        sio = socketio.AsyncClient(logger=logger)
+
+        @sio.event
+        async def disconnect() -> None:
+            logger.info("closing socket connection")
+            if sio.connected:
+                await sio.disconnect()
+
+        _sio = sio
+    return _sio
+
+
+def __getattr__(name: str) -> Any:
+    # keeps `from handshake_client.sockets import sio` working
+    if name == "sio":
+        return get_sio()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 async def get_connection(
     url: str, api_key: str, watch_chain: bool = True, watch_mempool: bool = True,
-) -> socketio.AsyncClient:
+) -> "socketio.AsyncClient":
     """
     see https://hsd-dev.org/guides/events.html
     """
@@ -16,6 +46,7 @@ async def get_connection(
     assert type(api_key) == str
     assert type(watch_chain) == bool
     assert type(watch_mempool) == bool
+    sio = get_sio()
     if sio.connected is False:
         await sio.connect(url, transports=["websocket"])
         await sio.call("auth", api_key)
@@ -26,22 +57,16 @@ async def get_connection(
     return sio
 
 
-@sio.event
-async def disconnect() -> None:
-    logger.info("closing socket connection")
-    if sio.connected:
-        await sio.disconnect()
-
-
 async def get_wallet_connection(
     url: str, api_key: str, wallet_id: str = "*",
-) -> socketio.AsyncClient:
+) -> "socketio.AsyncClient":
     """
     see https://hsd-dev.org/guides/events.html
     """
     assert type(url) == str
     assert type(api_key) == str
     assert type(wallet_id) == str
+    sio = get_sio()
     if sio.connected is False:
         await sio.connect(url, transports=["websocket"])
         await sio.call("auth", api_key)
@@ -0,0 +1,201 @@
+import asyncio
+import inspect
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, List, Optional, Tuple
+from handshake_client.chain import ChainEntry
+from handshake_client.errors import is_error
+from handshake_client.rpc import RpcClient
+
+
+logger = logging.getLogger("handshake.tip")
+
+# recent tips kept to restore the parent on a disconnect
+RECENT_TIPS = 100
+
+
+@dataclass()
+class Tip:
+    height: int
+    hash: str
+    # None for the parent of a disconnected block that was never the tip,
+    # until its header is read
+    time: Optional[int]
+    prevBlock: str
+    # True when this tip replaced blocks of the previous tip
+    reorg: bool = False
+
+
+class TipTracker:
+    """
+    Chain tip kept in memory, so height/hash/time checks need no node round trip.
+    Fed by socket chain events (attach), with RPC polling as a fallback (poll).
+    Subscribers get a Tip on every change, with reorg=True on reorgs. Callbacks
+    run on the event loop, coroutine functions are scheduled as tasks, blocking
+    height callbacks like FeeOracle.on_tip go through subscribe_height.
+    """
+
+    def __init__(self, client: Optional[RpcClient] = None):
+        """
+        client: needed for poll()
+        """
+        self.client = client
+        self.tip: Optional[Tip] = None
+        self.subscribers: List[Callable[[Tip], Any]] = []
+        self.waiters: List[Tuple[int, asyncio.Future]] = []
+        self.recent: "OrderedDict[str, Tip]" = OrderedDict()
+
+    @property
+    def height(self) -> int:
+        return self.tip.height if self.tip else -1
+
+    @property
+    def hash(self) -> Optional[str]:
+        return self.tip.hash if self.tip else None
+
+    @property
+    def time(self) -> Optional[int]:
+        return self.tip.time if self.tip else None
+
+    def subscribe(self, callback: Callable[[Tip], Any]) -> None:
+        self.subscribers.append(callback)
+
+    def subscribe_height(self, callback: Callable[[int], Any]) -> None:
+        """
+        blocking callback(height), ex. FeeOracle.on_tip, run in the default
+        executor on every change
+        """
+
+        def call(height: int) -> None:
+            try:
+                callback(height)
+            except Exception:
+                logger.exception(f"tip callback failed at height {height}")
+
+        def on_tip(tip: Tip) -> Any:
+            return asyncio.get_event_loop().run_in_executor(None, call, tip.height)
+
+        self.subscribers.append(on_tip)
+
+    async def wait_for_height(self, height: int) -> Tip:
+        """
+        wait until the tip is at or above height
+        """
+        assert type(height) == int
+        if self.tip is not None and self.tip.height >= height:
+            return self.tip
+        future = asyncio.get_event_loop().create_future()
+        self.waiters.append((height, future))
+        try:
+            return await future
+        finally:
+            self.waiters = [w for w in self.waiters if w[1] is not future]
+
+    def connect(self, entry: ChainEntry) -> None:
+        """
+        new tip from a 'chain connect' entry
+        """
+        reorg = self.tip is not None and entry.prevBlock != self.tip.hash
+        self._set(Tip(entry.height, entry.hash, entry.time, entry.prevBlock, reorg))
+
+    def disconnect(self, entry: ChainEntry) -> None:
+        """
+        the tip block was disconnected, its parent is the tip until the next connect
+        """
+        if self.tip is not None and self.tip.hash != entry.hash:
+            return
+        parent = self.recent.get(entry.prevBlock)
+        if parent is None:
+            parent = Tip(entry.height - 1, entry.prevBlock, None, "")
+        self._set(Tip(parent.height, parent.hash, parent.time, parent.prevBlock, True))
+
+    def _set(self, tip: Tip) -> None:
+        self.tip = tip
+        if tip.time is not None:
+            self.recent[tip.hash] = tip
+            self.recent.move_to_end(tip.hash)
+            while len(self.recent) > RECENT_TIPS:
+                self.recent.popitem(last=False)
+        if tip.reorg:
+            logger.info(f"reorg: new tip {tip.height} {tip.hash}")
+        for height, future in self.waiters:
+            if height <= tip.height and not future.done():
+                future.set_result(tip)
+        for callback in self.subscribers:
+            r = callback(tip)
+            if inspect.isawaitable(r):
+                asyncio.ensure_future(r)
+
+    async def attach(self, sio: Any) -> None:
+        """
+        seed from 'get tip' and follow chain events of a node socket
+        (sockets.get_connection with watch_chain=True)
+        """
+        tip = await sio.call("get tip")
+        if tip:
+            # same shape as example/socket_client.py
+            raw = tip[1] if isinstance(tip, (list, tuple)) else tip
+            self.connect(ChainEntry.from_raw(raw))
+
+        async def chain_connect(raw_entry: bytes) -> None:
+            self.connect(ChainEntry.from_raw(raw_entry))
+
+        async def chain_disconnect(raw_entry: bytes) -> None:
+            self.disconnect(ChainEntry.from_raw(raw_entry))
+            if self.tip is not None and self.tip.time is None:
+                await self._fill_time(self.tip)
+
+        sio.on("chain connect", chain_connect)
+        sio.on("chain disconnect", chain_disconnect)
+
+    async def poll(self) -> Optional[Tip]:
+        """
+        read the tip over rpc once, only fetches the header when the tip moved
+        """
+        assert self.client is not None
+        loop = asyncio.get_event_loop()
+        best = await loop.run_in_executor(None, self.client.getbestblockhash)
+        if is_error(best):
+            logger.warning(f"getbestblockhash failed: {best['error']}")
+            return None
+        if self.tip is not None and best == self.tip.hash:
+            return self.tip
+        header = await loop.run_in_executor(None, self.client.getblockheader, best)
+        if is_error(header):
+            return None
+        prev_block = header.get("previousblockhash") or "00" * 32
+        reorg = False
+        if self.tip is not None:
+            if header["height"] == self.tip.height + 1:
+                reorg = prev_block != self.tip.hash
+            else:
+                # missed blocks, check that the old tip is still in the main chain
+                old = await loop.run_in_executor(
+                    None, self.client.getblockhash, self.tip.height
+                )
+                reorg = old != self.tip.hash
+        self._set(Tip(header["height"], best, header["time"], prev_block, reorg))
+        return self.tip
+
+    async def _fill_time(self, tip: Tip) -> None:
+        """
+        read the time of a tip restored by disconnect, needs the client
+        """
+        if self.client is None:
+            return
+        loop = asyncio.get_event_loop()
+        header = await loop.run_in_executor(None, self.client.getblockheader, tip.hash)
+        if is_error(header):
+            logger.warning(f"getblockheader {tip.hash} failed: {header['error']}")
+            return
+        tip.time = header["time"]
+        tip.prevBlock = header.get("previousblockhash") or "00" * 32
+
+    async def poll_forever(self, interval: float = 5.0) -> None:
+        while True:
+            try:
+                await self.poll()
+            except Exception:
+                logger.exception("tip poll failed")
+            await asyncio.sleep(interval)
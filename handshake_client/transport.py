@@ -0,0 +1,408 @@
+import gzip
+import json
+import time
+import asyncio
+import inspect
+import logging
+import threading
+from collections import deque
+from decimal import Decimal
+from urllib.parse import urlsplit
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+
+logger = logging.getLogger("handshake.transport")
+
+# live send functions, see http_.Request._send and rpc.RpcClient._send
+HttpSend = Callable[[str, str, Optional[Dict[str, Any]]], Tuple[Any, bool]]
+RpcSend = Callable[[str, Tuple[Any, ...]], Tuple[Any, bool]]
+
+REDACTED = "<redacted>"
+# json keys whose values are never written, matched lowercase, plus every key
+# starting with one of SECRET_PREFIXES
+SECRET_KEYS = frozenset(
+    (
+        "passphrase",
+        "old",
+        "mnemonic",
+        "phrase",
+        "token",
+        "seed",
+        # create wallet: master xpriv and account xpub
+        "master",
+        "accountkey",
+    )
+)
+SECRET_PREFIXES = ("privkey", "privatekey", "xprivkey")
+# rpc method / socket call -> positions of secret arguments
+SECRET_ARGS = {
+    "walletpassphrase": (0,),
+    "walletpassphrasechange": (0, 1),
+    "encryptwallet": (0,),
+    "importprivkey": (0,),
+    "signmessagewithprivkey": (0,),
+    "signrawtransaction": (2,),
+    "auth": (0,),
+    "join": (1,),
+}
+# rpc methods whose result is a secret
+SECRET_RESULTS = frozenset(("dumpprivkey",))
+# pseudo rpc method of RpcClient.rpc_batch, its one argument is the list of
+# (method, params) calls
+BATCH = "batch"
+
+
+def _encode(value: Any) -> Any:
+    """
+    json safe copy, bytes (socket payloads) and Decimal (rpc numbers) are tagged
+    """
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return {"$b": bytes(value).hex()}
+    if isinstance(value, Decimal):
+        return {"$d": str(value)}
+    if isinstance(value, (list, tuple)):
+        return [_encode(v) for v in value]
+    if isinstance(value, dict):
+        return {k: _encode(v) for k, v in value.items()}
+    return value
+
+
+def _redact(value: Any) -> Any:
+    """
+    copy of a json value with the values of secret keys replaced
+    """
+    if isinstance(value, list):
+        return [_redact(v) for v in value]
+    if isinstance(value, dict):
+        return {
+            k: REDACTED if _secret_key(k) else _redact(v) for k, v in value.items()
+        }
+    return value
+
+
+def _secret_key(key: Any) -> bool:
+    key = str(key).lower()
+    return key in SECRET_KEYS or key.startswith(SECRET_PREFIXES)
+
+
+def _redact_args(name: str, args: Any) -> Any:
+    """
+    encoded and redacted arguments of an rpc method or socket call, the same
+    for the Recorder and the Replayer so recorded keys still match
+    """
+    if name == BATCH:
+        return [[[method, _redact_args(method, params)] for method, params in args[0]]]
+    args = _redact(_encode(args))
+    secret = SECRET_ARGS.get(name, ())
+    return [REDACTED if i in secret else a for i, a in enumerate(args)]
+
+
+def _redact_result(name: str, args: Any, result: Any) -> Any:
+    if name in SECRET_RESULTS:
+        return REDACTED
+    if name == BATCH and isinstance(result, list):
+        return [
+            _redact_result(method, params, r)
+            for (method, params), r in zip(args[0], result)
+        ]
+    return _redact(_encode(result))
+
+
+def _decode(value: Any) -> Any:
+    if isinstance(value, list):
+        return [_decode(v) for v in value]
+    if isinstance(value, dict):
+        if len(value) == 1:
+            if "$b" in value:
+                return bytes.fromhex(value["$b"])
+            if "$d" in value:
+                return Decimal(value["$d"])
+        return {k: _decode(v) for k, v in value.items()}
+    return value
+
+
+def _base(url: str) -> str:
+    """
+    port and path of an endpoint, credentials are never recorded
+    """
+    parts = urlsplit(url)
+    return f":{parts.port or ''}{parts.path.rstrip('/')}"
+
+
+def _key(kind: str, base: str, name: str, args: Any) -> str:
+    return json.dumps([kind, base, name, args], sort_keys=True, separators=(",", ":"))
+
+
+class Recorder:
+    """
+    Transport that sends to the live node and writes every request/response
+    pair, with its timing, to a gzip JSON lines file.
+
+    NOTE: recordings hold everything the node and wallet returned (addresses,
+    balances, transactions) and must be handled as sensitive. Known secrets
+    are replaced with "<redacted>" before writing: passphrases, tokens, seeds,
+    private keys (see SECRET_KEYS, SECRET_ARGS) and the dumpprivkey result,
+    anything else is written as is.
+
+        recorder = Recorder("session.jsonl.gz")
+        rpc = RpcClient(..., transport=recorder)
+        node = HttpClient(..., transport=recorder)
+        sio = RecordingSocket(await get_connection(...), recorder)
+        ...
+        recorder.close()
+    """
+
+    def __init__(self, path: str):
+        assert type(path) == str
+        self.file = gzip.open(path, "wt", encoding="utf-8")
+        self.started = time.monotonic()
+        self.lock = threading.Lock()
+
+    def write(self, entry: Dict[str, Any]) -> None:
+        line = json.dumps(entry, separators=(",", ":"))
+        with self.lock:
+            self.file.write(line + "\n")
+
+    def _timed(
+        self, send: Callable[[], Tuple[Any, bool]]
+    ) -> Tuple[Any, bool, float, float]:
+        start = time.monotonic()
+        r, overloaded = send()
+        return r, overloaded, start - self.started, time.monotonic() - start
+
+    def send_http(
+        self,
+        send: HttpSend,
+        endpoint: str,
+        method: str,
+        path: str,
+        params: Optional[Dict[str, Any]],
+    ) -> Tuple[Any, bool]:
+        r, overloaded, t, d = self._timed(lambda: send(method, path, params))
+        self.write(
+            {
+                "k": "http",
+                "b": _base(endpoint),
+                "n": f"{method} {path}",
+                "a": _redact(_encode(params)),
+                "r": _redact(_encode(r)),
+                "o": overloaded,
+                "t": round(t, 6),
+                "d": round(d, 6),
+            }
+        )
+        return r, overloaded
+
+    def send_rpc(
+        self, send: RpcSend, url: str, method: str, args: Tuple[Any, ...]
+    ) -> Tuple[Any, bool]:
+        r, overloaded, t, d = self._timed(lambda: send(method, args))
+        self.write(
+            {
+                "k": "rpc",
+                "b": _base(url),
+                "n": method,
+                "a": _redact_args(method, args),
+                "r": _redact_result(method, args, r),
+                "o": overloaded,
+                "t": round(t, 6),
+                "d": round(d, 6),
+            }
+        )
+        return r, overloaded
+
+    def close(self) -> None:
+        with self.lock:
+            self.file.close()
+
+    def __enter__(self) -> "Recorder":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+
+class RecordingSocket:
+    """
+    Wraps a socketio client: events delivered to handlers registered with on()
+    and the answers to call() are written to the recorder.
+    Everything else is passed through to the wrapped client.
+    """
+
+    def __init__(self, sio: Any, recorder: Recorder):
+        self.sio = sio
+        self.recorder = recorder
+
+    def on(self, event: str, handler: Any = None) -> Any:
+        def register(handler: Any) -> Any:
+            async def recording(*args: Any) -> Any:
+                t = time.monotonic() - self.recorder.started
+                self.recorder.write(
+                    {
+                        "k": "event",
+                        "n": event,
+                        "a": _redact(_encode(args)),
+                        "t": round(t, 6),
+                    }
+                )
+                r = handler(*args)
+                if inspect.isawaitable(r):
+                    r = await r
+                return r
+
+            self.sio.on(event, recording)
+            return handler
+
+        return register(handler) if handler is not None else register
+
+    async def call(self, event: str, *args: Any, **kwargs: Any) -> Any:
+        start = time.monotonic()
+        r = await self.sio.call(event, *args, **kwargs)
+        self.recorder.write(
+            {
+                "k": "call",
+                "b": "",
+                "n": event,
+                "a": _redact_args(event, args),
+                "r": _redact(_encode(r)),
+                "t": round(start - self.recorder.started, 6),
+                "d": round(time.monotonic() - start, 6),
+            }
+        )
+        return r
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.sio, name)
+
+
+def load(path: str) -> List[Dict[str, Any]]:
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+class Replayer:
+    """
+    Transport that answers from a Recorder file, no network.
+    Requests are matched on (endpoint port and path, method, arguments), with
+    secrets redacted like the Recorder does, and answered in recorded order;
+    once a request has used up its recordings the last answer is repeated, so
+    benchmarks can run longer than the recording.
+    Unknown requests get a handshake error response.
+
+    speed: 1.0 replays the recorded latency, 10.0 ten times faster,
+           0 answers immediately
+    """
+
+    def __init__(self, path: str, speed: float = 1.0):
+        assert speed >= 0
+        self.speed = speed
+        self.entries = load(path)
+        self.answers: Dict[str, Deque[Dict[str, Any]]] = {}
+        self.last: Dict[str, Dict[str, Any]] = {}
+        self.lock = threading.Lock()
+        for entry in self.entries:
+            if entry["k"] == "event":
+                continue
+            key = _key(entry["k"], entry["b"], entry["n"], entry["a"])
+            self.answers.setdefault(key, deque()).append(entry)
+
+    def _answer(self, key: str) -> Optional[Dict[str, Any]]:
+        with self.lock:
+            queue = self.answers.get(key)
+            if queue:
+                self.last[key] = queue.popleft()
+            return self.last.get(key)
+
+    def _delay(self, entry: Dict[str, Any]) -> float:
+        return entry["d"] / self.speed if self.speed else 0.0
+
+    def _reply(self, key: str, what: str) -> Tuple[Any, bool]:
+        entry = self._answer(key)
+        if entry is None:
+            logger.warning(f"no recording for {what}")
+            return {"error": {"message": f"no recording for {what}"}}, False
+        delay = self._delay(entry)
+        if delay:
+            time.sleep(delay)
+        return _decode(entry["r"]), entry["o"]
+
+    def send_http(
+        self,
+        send: HttpSend,
+        endpoint: str,
+        method: str,
+        path: str,
+        params: Optional[Dict[str, Any]],
+    ) -> Tuple[Any, bool]:
+        name = f"{method} {path}"
+        args = _redact(_encode(params))
+        return self._reply(_key("http", _base(endpoint), name, args), name)
+
+    def send_rpc(
+        self, send: RpcSend, url: str, method: str, args: Tuple[Any, ...]
+    ) -> Tuple[Any, bool]:
+        key = _key("rpc", _base(url), method, _redact_args(method, args))
+        return self._reply(key, method)
+
+    def socket(self) -> "ReplaySocket":
+        return ReplaySocket(self)
+
+
+class ReplaySocket:
+    """
+    Stand-in for the socketio client: handlers registered with on() get the
+    recorded events from run(), call() answers from the recording.
+    """
+
+    def __init__(self, replayer: Replayer):
+        self.replayer = replayer
+        self.handlers: Dict[str, Any] = {}
+        self.connected = True
+
+    def on(self, event: str, handler: Any = None) -> Any:
+        def register(handler: Any) -> Any:
+            self.handlers[event] = handler
+            return handler
+
+        return register(handler) if handler is not None else register
+
+    async def call(self, event: str, *args: Any, **kwargs: Any) -> Any:
+        key = _key("call", "", event, _redact_args(event, args))
+        entry = self.replayer._answer(key)
+        if entry is None:
+            logger.warning(f"no recording for socket call {event}")
+            return None
+        delay = self.replayer._delay(entry)
+        if delay:
+            await asyncio.sleep(delay)
+        return _decode(entry["r"])
+
+    async def emit(self, event: str, *args: Any, **kwargs: Any) -> None:
+        pass
+
+    async def disconnect(self) -> None:
+        self.connected = False
+
+    async def run(self) -> int:
+        """
+        deliver the recorded events with their original spacing (scaled by
+        speed), returns the number of delivered events
+        """
+        events = [e for e in self.replayer.entries if e["k"] == "event"]
+        speed = self.replayer.speed
+        start = time.monotonic()
+        first = events[0]["t"] if events else 0.0
+        delivered = 0
+        for entry in events:
+            if speed:
+                wait = (entry["t"] - first) / speed - (time.monotonic() - start)
+                if wait > 0:
+                    await asyncio.sleep(wait)
+            handler = self.handlers.get(entry["n"])
+            if handler is None:
+                continue
+            r = handler(*_decode(entry["a"]))
+            if inspect.isawaitable(r):
+                await r
+            delivered += 1
+        return delivered
@@ -0,0 +1,287 @@
+from hashlib import sha3_256
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+from handshake_client.chain import ChainEntry
+from handshake_client.errors import VerifyError
+from handshake_client.primitives import BlockHeader, blake256
+
+
+# urkel radix tree hashing (blake2b-256), see https://github.com/handshake-org/urkel
+LEAF_PREFIX = b"\x00"
+INTERNAL_PREFIX = b"\x01"
+# internal node with a prefix: bits shared by everything below it are skipped
+SKIP_PREFIX = b"\x02"
+ZERO_HASH = b"\x00" * 32
+KEY_BITS = 256
+
+TYPE_DEADEND = "DEADEND"
+TYPE_SHORT = "SHORT"
+TYPE_COLLISION = "COLLISION"
+TYPE_EXISTS = "EXISTS"
+PROOF_TYPES = (TYPE_DEADEND, TYPE_SHORT, TYPE_COLLISION, TYPE_EXISTS)
+
+
+def hash_name(name: str) -> bytes:
+    """
+    tree key of a name (hsd rules.hashName)
+    """
+    return sha3_256(name.encode("ascii")).digest()
+
+
+def hash_leaf(key: bytes, value_hash: bytes) -> bytes:
+    return blake256(LEAF_PREFIX, key, value_hash)
+
+
+def hash_internal(prefix: "Bits", left: bytes, right: bytes) -> bytes:
+    if prefix.size == 0:
+        return blake256(INTERNAL_PREFIX, left, right)
+    return blake256(SKIP_PREFIX, prefix.encode(), left, right)
+
+
+def has_bit(key: bytes, index: int) -> int:
+    return (key[index >> 3] >> (7 - (index & 7))) & 1
+
+
+@dataclass()
+class Bits:
+    """
+    prefix of a radix node, size bits packed most significant first
+    """
+
+    size: int
+    data: bytes
+
+    @classmethod
+    def from_string(cls, bits: str) -> "Bits":
+        """
+        from the json form, ex. "0110"
+        """
+        if len(bits) > KEY_BITS or not set(bits) <= {"0", "1"}:
+            raise VerifyError("name proof: malformed prefix")
+        data = bytearray((len(bits) + 7) >> 3)
+        for i, bit in enumerate(bits):
+            if bit == "1":
+                data[i >> 3] |= 0x80 >> (i & 7)
+        return cls(len(bits), bytes(data))
+
+    def encode(self) -> bytes:
+        """
+        size (one byte, two with the high bit set from 0x80) and the bit bytes
+        """
+        if self.size < 0x80:
+            return bytes([self.size]) + self.data
+        return bytes([0x80 | (self.size >> 8), self.size & 0xFF]) + self.data
+
+    def has(self, key: bytes, depth: int) -> bool:
+        """
+        whether key continues with these bits at depth
+        """
+        return all(
+            has_bit(self.data, i) == has_bit(key, depth + i) for i in range(self.size)
+        )
+
+
+EMPTY_BITS = Bits(0, b"")
+
+
+@dataclass()
+class NameProof:
+    """
+    proof part of getnameproof
+    nodes: (prefix, sibling hash) from the root down
+    prefix, left, right: the node that diverges from the key of a short proof
+    key, hash: the other leaf of a collision proof
+    value: the raw name state of an exists proof
+    """
+
+    type: str
+    nodes: List[Tuple[Bits, bytes]]
+    prefix: Optional[Bits] = None
+    left: Optional[bytes] = None
+    right: Optional[bytes] = None
+    key: Optional[bytes] = None
+    hash: Optional[bytes] = None
+    value: Optional[bytes] = None
+
+    @classmethod
+    def from_json(
+        cls, proof: Dict[str, Any], nodes: List[Tuple[Bits, bytes]]
+    ) -> "NameProof":
+        type_ = str(proof.get("type", "")).replace("TYPE_", "")
+        if type_ not in PROOF_TYPES:
+            raise VerifyError(f"name proof: unknown type {proof.get('type')}")
+
+        def optional(field: str) -> Optional[bytes]:
+            value = proof.get(field)
+            return bytes.fromhex(value) if value else None
+
+        prefix = proof.get("prefix")
+        return cls(
+            type_,
+            nodes,
+            Bits.from_string(prefix) if isinstance(prefix, str) else None,
+            optional("left"),
+            optional("right"),
+            optional("key"),
+            optional("hash"),
+            optional("value"),
+        )
+
+
+@dataclass()
+class NameProofResult:
+    name: str
+    block_hash: str
+    height: int
+    # raw NameState, None when the name is not in the tree
+    value: Optional[bytes]
+
+    @property
+    def exists(self) -> bool:
+        return self.value is not None
+
+
+class UrkelVerifier:
+    """
+    Verify getnameproof results locally against a trusted header treeRoot.
+    Names proven against the same root share the top of their paths: sibling
+    nodes are decoded once and internal hashes are cached by their children,
+    so a batch only hashes what differs between the proofs.
+
+    Proofs are from hsd's radix urkel tree, each node is [prefix bits, hash].
+    A plain hash is read as a node with an empty prefix.
+    """
+
+    def __init__(self, max_cache: int = 100000):
+        self.max_cache = max_cache
+        self.nodes: Dict[str, Tuple[Bits, bytes]] = {}
+        self.hashes: Dict[bytes, bytes] = {}
+
+    def _node(self, node: Any) -> Tuple[Bits, bytes]:
+        if isinstance(node, list) and len(node) == 2:
+            prefix, hash_ = node
+        else:
+            prefix, hash_ = "", node
+        if not isinstance(prefix, str) or not isinstance(hash_, str):
+            raise VerifyError("name proof: malformed node")
+        if len(hash_) != 64:
+            raise VerifyError("name proof: malformed node")
+        cache_key = prefix + ":" + hash_
+        value = self.nodes.get(cache_key)
+        if value is None:
+            if len(self.nodes) >= self.max_cache:
+                self.nodes.clear()
+            bits = Bits.from_string(prefix) if prefix else EMPTY_BITS
+            value = self.nodes[cache_key] = (bits, bytes.fromhex(hash_))
+        return value
+
+    def _internal(self, prefix: Bits, left: bytes, right: bytes) -> bytes:
+        key = prefix.encode() + left + right
+        value = self.hashes.get(key)
+        if value is None:
+            if len(self.hashes) >= self.max_cache:
+                self.hashes.clear()
+            value = self.hashes[key] = hash_internal(prefix, left, right)
+        return value
+
+    def decode(self, proof: Dict[str, Any]) -> NameProof:
+        nodes = proof.get("nodes")
+        if not isinstance(nodes, list) or len(nodes) > KEY_BITS:
+            raise VerifyError("name proof: malformed nodes")
+        return NameProof.from_json(proof, [self._node(node) for node in nodes])
+
+    def verify(self, root: bytes, key: bytes, proof: NameProof) -> Optional[bytes]:
+        """
+        value proven for key (None for a non-existence proof), raises VerifyError
+        """
+        # every node on the path is one branch bit plus its skipped prefix bits
+        depth = sum(prefix.size + 1 for prefix, _ in proof.nodes)
+        if depth > KEY_BITS:
+            raise VerifyError("name proof: too deep")
+        if proof.type == TYPE_DEADEND:
+            next_ = ZERO_HASH
+        elif proof.type == TYPE_SHORT:
+            if proof.prefix is None or proof.left is None or proof.right is None:
+                raise VerifyError("name proof: malformed short")
+            if depth + proof.prefix.size > KEY_BITS:
+                raise VerifyError("name proof: too deep")
+            if proof.prefix.has(key, depth):
+                # the key would continue below this node, not a proof of absence
+                raise VerifyError("name proof: short proof on the key path")
+            next_ = self._internal(proof.prefix, proof.left, proof.right)
+        elif proof.type == TYPE_COLLISION:
+            if proof.key is None or proof.hash is None:
+                raise VerifyError("name proof: malformed collision")
+            if proof.key == key:
+                raise VerifyError("name proof: collision with the same key")
+            next_ = hash_leaf(proof.key, proof.hash)
+        else:
+            if proof.value is None:
+                raise VerifyError("name proof: malformed exists")
+            next_ = hash_leaf(key, blake256(proof.value))
+        # from the leaf up to the root
+        for prefix, node in reversed(proof.nodes):
+            depth -= 1
+            if has_bit(key, depth):
+                next_ = self._internal(prefix, node, next_)
+            else:
+                next_ = self._internal(prefix, next_, node)
+            depth -= prefix.size
+            if not prefix.has(key, depth):
+                raise VerifyError("name proof: path does not match the key")
+        if next_ != root:
+            raise VerifyError("name proof: root mismatch")
+        return proof.value if proof.type == TYPE_EXISTS else None
+
+    def verify_name(
+        self,
+        result: Dict[str, Any],
+        trusted: Optional[Union[BlockHeader, ChainEntry]] = None,
+    ) -> NameProofResult:
+        """
+        result: getnameproof output
+        trusted: header of result["hash"] from our own chain, its treeRoot is the
+                 root the proof must lead to. None trusts result["root"].
+        raises VerifyError
+        """
+        try:
+            name = result["name"]
+            root = result["root"]
+            root_hash = bytes.fromhex(root)
+            proof = self.decode(result["proof"])
+        except (KeyError, TypeError, ValueError) as e:
+            raise VerifyError(f"name proof: malformed result ({e})")
+        if trusted is not None:
+            if trusted.hash != result.get("hash"):
+                raise VerifyError("name proof: block hash does not match")
+            if trusted.treeRoot != root:
+                raise VerifyError("name proof: tree root does not match")
+        key = hash_name(name)
+        if result.get("key") not in (None, key.hex()):
+            raise VerifyError("name proof: key does not match the name")
+        value = self.verify(root_hash, key, proof)
+        return NameProofResult(
+            name, result.get("hash", ""), result.get("height", -1), value
+        )
+
+    def verify_batch(
+        self,
+        results: Iterable[Dict[str, Any]],
+        trusted: Optional[Dict[str, Union[BlockHeader, ChainEntry]]] = None,
+    ) -> List[Union[NameProofResult, VerifyError]]:
+        """
+        trusted: {block hash: header}, a proof for a block missing from it fails
+        returns a NameProofResult or the VerifyError for every result, in order
+        """
+        out: List[Union[NameProofResult, VerifyError]] = []
+        for result in results:
+            try:
+                header = None
+                if trusted is not None:
+                    header = trusted.get(result.get("hash", ""))
+                    if header is None:
+                        raise VerifyError("name proof: unknown block")
+                out.append(self.verify_name(result, header))
+            except VerifyError as e:
+                out.append(e)
+        return out
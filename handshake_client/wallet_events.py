@@ -0,0 +1,154 @@
+import asyncio
+from typing import Any, Dict, FrozenSet, Iterable, List, NamedTuple, Optional, Union
+
+
+# see https://hsd-dev.org/guides/events.html
+TX_EVENTS = ("tx", "confirmed", "unconfirmed", "conflict")
+WALLET_EVENTS = TX_EVENTS + ("balance", "address")
+
+
+class WalletTxEvent(NamedTuple):
+    event: str
+    wallet_id: str
+    hash: str
+    height: int
+    time: int
+    fee: int
+    # the original payload, kept as is (not copied)
+    data: Dict[str, Any]
+
+
+class WalletBalanceEvent(NamedTuple):
+    event: str
+    wallet_id: str
+    account: int
+    confirmed: int
+    unconfirmed: int
+    data: Dict[str, Any]
+
+
+class WalletAddressEvent(NamedTuple):
+    event: str
+    wallet_id: str
+    addresses: List[str]
+    data: List[Dict[str, Any]]
+
+
+WalletEvent = Union[WalletTxEvent, WalletBalanceEvent, WalletAddressEvent]
+
+
+class WalletEventStream:
+    """
+    Async iterator over wallet socket events, decoded into small tuples.
+    Only the requested events get a handler and the wallet ID is checked before
+    anything is decoded, so unwanted events cost one set lookup.
+
+        stream = WalletEventStream(sio, wallet_ids=["primary"], events=["tx"])
+        await stream.join()
+        async for event in stream:
+            ...
+
+    NOTE: socketio keeps one handler per event, so use one stream per connection.
+    """
+
+    def __init__(
+        self,
+        sio: Any,
+        wallet_ids: Optional[Iterable[str]] = None,
+        events: Iterable[str] = WALLET_EVENTS,
+        maxsize: int = 10000,
+    ):
+        """
+        wallet_ids: None for every wallet
+        maxsize: queued events before the socket handlers wait for the consumer
+        """
+        self.sio = sio
+        self.wallet_ids: Optional[FrozenSet[str]] = (
+            frozenset(wallet_ids) if wallet_ids is not None else None
+        )
+        self.events = tuple(events)
+        assert all(event in WALLET_EVENTS for event in self.events)
+        self.queue: "asyncio.Queue[Optional[WalletEvent]]" = asyncio.Queue(maxsize)
+        self.closed = False
+        for event in self.events:
+            sio.on(event, self._handler(event))
+
+    async def join(self) -> None:
+        """
+        join the wallet rooms (admin api key), '*' when no wallet IDs were given
+        """
+        for wallet_id in self.wallet_ids or ("*",):
+            await self.sio.call("join", wallet_id)
+
+    def _handler(self, event: str) -> Any:
+        wallet_ids = self.wallet_ids
+        put = self.queue.put
+        if event in TX_EVENTS:
+            decode: Any = _decode_tx
+        elif event == "balance":
+            decode = _decode_balance
+        else:
+            decode = _decode_address
+
+        async def handler(wallet_id: str, payload: Any) -> None:
+            if self.closed:
+                return
+            if wallet_ids is not None and wallet_id not in wallet_ids:
+                return
+            await put(decode(event, wallet_id, payload))
+
+        return handler
+
+    def __aiter__(self) -> "WalletEventStream":
+        return self
+
+    async def __anext__(self) -> WalletEvent:
+        if self.closed and self.queue.empty():
+            raise StopAsyncIteration
+        item = await self.queue.get()
+        if item is None:
+            raise StopAsyncIteration
+        return item
+
+    def close(self) -> None:
+        """
+        end the iteration once the queued events are consumed, events that
+        arrive after are dropped
+        """
+        self.closed = True
+        # wakes a consumer waiting on an empty queue, a full one ends on its own
+        if not self.queue.full():
+            self.queue.put_nowait(None)
+
+
+def _decode_tx(event: str, wallet_id: str, payload: Dict[str, Any]) -> WalletTxEvent:
+    return WalletTxEvent(
+        event,
+        wallet_id,
+        payload["hash"],
+        payload.get("height", -1),
+        payload.get("time", 0),
+        payload.get("fee", 0),
+        payload,
+    )
+
+
+def _decode_balance(
+    event: str, wallet_id: str, payload: Dict[str, Any]
+) -> WalletBalanceEvent:
+    return WalletBalanceEvent(
+        event,
+        wallet_id,
+        payload.get("account", -1),
+        payload["confirmed"],
+        payload["unconfirmed"],
+        payload,
+    )
+
+
+def _decode_address(
+    event: str, wallet_id: str, payload: List[Dict[str, Any]]
+) -> WalletAddressEvent:
+    return WalletAddressEvent(
+        event, wallet_id, [address["address"] for address in payload], payload
+    )
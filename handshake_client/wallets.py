@@ -0,0 +1,128 @@
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, Future, wait
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Tuple
+from requests import Session
+from requests.adapters import HTTPAdapter
+from handshake_client.constant import TIMEOUT
+from handshake_client.errors import unwrap
+from handshake_client.http_ import WalletAdminCommand, WalletHttpClient
+
+
+class MultiWalletClient:
+    """
+    Run the same WalletHttpClient call across many wallets.
+    All wallets share one requests.Session, so connections are pooled and
+    reused no matter how many wallet IDs there are.
+    Results are streamed as (wallet_id, result) in completion order.
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        host: str,
+        port: str,
+        user: str = "x",
+        ssl: bool = False,
+        timeout: int = TIMEOUT,
+        max_workers: int = 16,
+        max_clients: int = 1024,
+    ):
+        """
+        max_workers: number of concurrent requests (and pooled connections)
+        max_clients: per wallet clients kept for reuse, least recently used
+                     ones are dropped (they are cheap to recreate)
+        """
+        assert type(api_key) == str
+        assert type(host) == str
+        assert type(port) == str
+        assert type(max_workers) == int and max_workers > 0
+        assert type(max_clients) == int and max_clients > 0
+        self.params = {
+            "api_key": api_key,
+            "host": host,
+            "port": port,
+            "user": user,
+            "ssl": ssl,
+            "timeout": timeout,
+        }
+        self.max_workers = max_workers
+        self.max_clients = max_clients
+        self.session = Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.admin = WalletAdminCommand(session=self.session, **self.params)
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.clients: "OrderedDict[str, WalletHttpClient]" = OrderedDict()
+        self.clients_lock = threading.Lock()
+
+    def wallet(self, wallet_id: str) -> WalletHttpClient:
+        with self.clients_lock:
+            client = self.clients.get(wallet_id)
+            if client is None:
+                client = WalletHttpClient(
+                    wallet_id, session=self.session, **self.params
+                )
+                self.clients[wallet_id] = client
+                if len(self.clients) > self.max_clients:
+                    self.clients.popitem(last=False)
+            else:
+                self.clients.move_to_end(wallet_id)
+            return client
+
+    def wallet_ids(self) -> List[str]:
+        return unwrap(self.admin.get_all_wallets())
+
+    def map(
+        self,
+        func: Callable[[WalletHttpClient], Any],
+        wallet_ids: Optional[List[str]] = None,
+    ) -> Iterator[Tuple[str, Any]]:
+        """
+        Call func(client) for every wallet and yield (wallet_id, result) as they finish.
+        At most max_workers calls are in flight, so memory stays bounded for
+        thousands of wallets. Error responses are yielded as they are.
+        """
+        if wallet_ids is None:
+            wallet_ids = self.wallet_ids()
+        pending: Set[Future] = set()
+        owners: Dict[Future, str] = {}
+        ids = iter(wallet_ids)
+        while True:
+            for wallet_id in ids:
+                future = self.executor.submit(func, self.wallet(wallet_id))
+                owners[future] = wallet_id
+                pending.add(future)
+                if len(pending) >= self.max_workers:
+                    break
+            if not pending:
+                return
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                wallet_id = owners.pop(future)
+                exc = future.exception()
+                if exc is not None:
+                    yield wallet_id, {"error": {"message": str(exc)}}
+                else:
+                    yield wallet_id, future.result()
+
+    def get_balances(
+        self, account: str = "default", wallet_ids: Optional[List[str]] = None
+    ) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        assert type(account) == str
+        return self.map(lambda client: client.get_balance(account), wallet_ids)
+
+    def get_pending_transactions(
+        self, wallet_ids: Optional[List[str]] = None
+    ) -> Iterator[Tuple[str, List[Dict[str, Any]]]]:
+        return self.map(lambda client: client.get_pending_transactions(), wallet_ids)
+
+    def get_all_coins(
+        self, wallet_ids: Optional[List[str]] = None
+    ) -> Iterator[Tuple[str, List[Dict[str, Any]]]]:
+        return self.map(lambda client: client.get_all_coins(), wallet_ids)
+
+    def close(self) -> None:
+        self.executor.shutdown()
+        self.session.close()
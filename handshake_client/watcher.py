@@ -0,0 +1,308 @@
+import struct
+import logging
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from handshake_client.bloom import BloomFilter, BLOOM_UPDATE_ALL
+from handshake_client.chain import ChainEntry
+from handshake_client.constant import NETWORK_HRP
+from handshake_client.errors import unwrap
+from handshake_client.primitives import Address, Block, Transaction
+
+
+logger = logging.getLogger("handshake.watcher")
+
+OutpointKey = Tuple[str, int]
+
+
+def outpoint_raw(key: OutpointKey) -> bytes:
+    """
+    serialized outpoint (hash, u32 LE index), the filter element hsd tests
+    inputs against
+    """
+    return bytes.fromhex(key[0]) + struct.pack("<I", key[1])
+
+
+@dataclass()
+class Coin:
+    address: str
+    value: int
+    # -1 while unconfirmed
+    height: int
+
+
+@dataclass()
+class BalanceDelta:
+    """
+    change of one address balance caused by one transaction
+    """
+
+    address: str
+    confirmed: int
+    unconfirmed: int
+    hash: str
+    height: int
+
+
+class AddressWatcher:
+    """
+    In-memory UTXO set and balances for a fixed address set.
+    Seed once with seed(), then feed blocks and mempool txs (or attach() to a
+    node socket). Balances follow hsd semantics: unconfirmed includes confirmed.
+    """
+
+    def __init__(
+        self, addresses: Iterable[str], network: str = "main", max_undo: int = 100
+    ):
+        """
+        max_undo: number of recent blocks that can be disconnected
+        """
+        assert network in NETWORK_HRP
+        assert type(max_undo) == int
+        self.max_undo = max_undo
+        self.hrp = NETWORK_HRP[network]
+        self.addresses = set(addresses)
+        self.coins: Dict[OutpointKey, Coin] = {}
+        self.balances: Dict[str, List[int]] = {}
+        # outpoint -> hash of the mempool tx spending it
+        self.spent: Dict[OutpointKey, str] = {}
+        # mempool tx hash -> (spent outpoints, created outpoints)
+        self.pending: Dict[str, Tuple[List[OutpointKey], List[OutpointKey]]] = {}
+        # block hash -> undo records
+        self.undo: Dict[str, List[Tuple[str, OutpointKey, Any]]] = {}
+        self.subscribers: List[Callable[[BalanceDelta], None]] = []
+        self._deltas: Dict[str, List[int]] = {}
+        # socket filter set by attach, and the coins created since it was sent
+        self.bloom: Optional[BloomFilter] = None
+        self.new_outpoints: List[OutpointKey] = []
+
+    def subscribe(self, callback: Callable[[BalanceDelta], None]) -> None:
+        self.subscribers.append(callback)
+
+    def balance(self, address: str) -> Tuple[int, int]:
+        """
+        (confirmed, unconfirmed)
+        """
+        confirmed, unconfirmed = self.balances.get(address, (0, 0))
+        return confirmed, unconfirmed
+
+    def seed(self, client: Any, chunk_size: int = 1000) -> int:
+        """
+        load current coins with HttpClient.get_coin_by_addresses
+        returns the number of coins loaded
+        """
+        assert type(chunk_size) == int
+        addresses = sorted(self.addresses)
+        count = 0
+        for i in range(0, len(addresses), chunk_size):
+            chunk = addresses[i : i + chunk_size]
+            for coin in unwrap(client.get_coin_by_addresses(chunk)):
+                key = (coin["hash"], coin["index"])
+                if key in self.coins:
+                    continue
+                value = coin["value"]
+                height = coin.get("height", -1)
+                self.coins[key] = Coin(coin["address"], value, height)
+                self._change(coin["address"], value if height >= 0 else 0, value)
+                count += 1
+        self._deltas.clear()
+        return count
+
+    def add_tx(self, tx: Transaction) -> None:
+        """
+        mempool transaction
+        """
+        if tx.hash in self.pending:
+            return
+        spent: List[OutpointKey] = []
+        created: List[OutpointKey] = []
+        for tx_input in tx.inputs:
+            key = (tx_input.prevout.hash, tx_input.prevout.index)
+            coin = self.coins.get(key)
+            if coin is None or key in self.spent:
+                continue
+            self.spent[key] = tx.hash
+            self._change(coin.address, 0, -coin.value)
+            spent.append(key)
+        for index, output in enumerate(tx.outputs):
+            address = output.address.to_string(self.hrp)
+            if address not in self.addresses:
+                continue
+            key = (tx.hash, index)
+            self.coins[key] = Coin(address, output.value, -1)
+            self._change(address, 0, output.value)
+            self._track(key)
+            created.append(key)
+        if spent or created:
+            self.pending[tx.hash] = (spent, created)
+        self._emit(tx.hash, -1)
+
+    def connect_block(self, block: Block, height: int) -> None:
+        assert type(height) == int
+        self.connect_txs(block.hash, height, block.txs)
+
+    def connect_txs(self, block_hash: str, height: int, txs: List[Transaction]) -> None:
+        """
+        connect the (possibly filtered) transactions of a block
+        """
+        undo: List[Tuple[str, OutpointKey, Any]] = []
+        for tx in txs:
+            self._connect_tx(tx, height, undo)
+            self._emit(tx.hash, height)
+        self.undo[block_hash] = undo
+        while len(self.undo) > self.max_undo:
+            del self.undo[next(iter(self.undo))]
+
+    def _connect_tx(
+        self, tx: Transaction, height: int, undo: List[Tuple[str, OutpointKey, Any]]
+    ) -> None:
+        for tx_input in tx.inputs:
+            key = (tx_input.prevout.hash, tx_input.prevout.index)
+            coin = self.coins.get(key)
+            if coin is None:
+                continue
+            spender = self.spent.get(key)
+            if spender is not None and spender != tx.hash:
+                # double spent by this block, the mempool tx is gone
+                self._remove_pending(spender)
+                spender = self.spent.get(key)
+            del self.coins[key]
+            self.spent.pop(key, None)
+            confirmed = -coin.value if coin.height >= 0 else 0
+            unconfirmed = -coin.value if spender is None else 0
+            self._change(coin.address, confirmed, unconfirmed)
+            undo.append(("spend", key, (coin, tx.hash)))
+        self.pending.pop(tx.hash, None)
+        for index, output in enumerate(tx.outputs):
+            key = (tx.hash, index)
+            coin = self.coins.get(key)
+            if coin is not None:
+                coin.height = height
+                self._change(coin.address, coin.value, 0)
+                undo.append(("confirm", key, None))
+                continue
+            address = output.address.to_string(self.hrp)
+            if address not in self.addresses:
+                continue
+            self.coins[key] = Coin(address, output.value, height)
+            self._change(address, output.value, output.value)
+            self._track(key)
+            undo.append(("confirm", key, None))
+
+    def _track(self, key: OutpointKey) -> None:
+        if self.bloom is not None:
+            self.new_outpoints.append(key)
+
+    def disconnect_block(self, block_hash: str) -> None:
+        """
+        Undo a block. Its transactions are treated as back in the mempool,
+        like hsd does on a reorg.
+        """
+        undo = self.undo.pop(block_hash, None)
+        if undo is None:
+            logger.warning(f"no undo data for block {block_hash}")
+            return
+        for action, key, data in reversed(undo):
+            if action == "confirm":
+                coin = self.coins[key]
+                coin.height = -1
+                self._change(coin.address, -coin.value, 0)
+                spent, created = self.pending.setdefault(key[0], ([], []))
+                created.append(key)
+            elif action == "spend":
+                coin, tx_hash = data
+                self.coins[key] = coin
+                self.spent[key] = tx_hash
+                self._change(coin.address, coin.value if coin.height >= 0 else 0, 0)
+                spent, created = self.pending.setdefault(tx_hash, ([], []))
+                spent.append(key)
+        self._emit(block_hash, -1)
+
+    def _remove_pending(self, tx_hash: str) -> None:
+        record = self.pending.pop(tx_hash, None)
+        if record is None:
+            return
+        spent, created = record
+        for key in spent:
+            coin = self.coins.get(key)
+            if coin is not None and self.spent.get(key) == tx_hash:
+                del self.spent[key]
+                self._change(coin.address, 0, coin.value)
+        for key in created:
+            coin = self.coins.pop(key, None)
+            if coin is None:
+                continue
+            self._change(coin.address, 0, -coin.value)
+            spender = self.spent.pop(key, None)
+            if spender is not None:
+                self._remove_pending(spender)
+
+    def _change(self, address: str, confirmed: int, unconfirmed: int) -> None:
+        balance = self.balances.setdefault(address, [0, 0])
+        balance[0] += confirmed
+        balance[1] += unconfirmed
+        delta = self._deltas.setdefault(address, [0, 0])
+        delta[0] += confirmed
+        delta[1] += unconfirmed
+
+    def _emit(self, tx_hash: str, height: int) -> None:
+        deltas, self._deltas = self._deltas, {}
+        for address, (confirmed, unconfirmed) in deltas.items():
+            if confirmed == 0 and unconfirmed == 0:
+                continue
+            delta = BalanceDelta(address, confirmed, unconfirmed, tx_hash, height)
+            for callback in self.subscribers:
+                callback(delta)
+
+    def build_filter(self, rate: float = 0.0001, headroom: int = 1000) -> BloomFilter:
+        """
+        bloom filter for the socket 'set filter': the watched address hashes
+        match outputs, the outpoints of the tracked coins match the inputs
+        spending them (hsd does not match inputs by address)
+        headroom: room for coins created after the filter is built
+        """
+        items = max(1, len(self.addresses) + len(self.coins) + headroom)
+        bloom = BloomFilter.from_rate(items, rate, 0, BLOOM_UPDATE_ALL)
+        for address in self.addresses:
+            bloom.add(bytes.fromhex(Address.from_string(address).hash))
+        for key in self.coins:
+            bloom.add(outpoint_raw(key))
+        return bloom
+
+    async def attach(self, sio: Any, bloom: Optional[BloomFilter] = None) -> None:
+        """
+        Feed the watcher from a node socket (see sockets.get_connection).
+        hsd only sends block txs and mempool txs that match the socket filter,
+        so the filter is set here.
+        """
+        if bloom is None:
+            bloom = self.build_filter()
+        self.bloom = bloom
+        self.new_outpoints = []
+        await sio.call("set filter", bloom.to_raw())
+
+        async def add_outpoints() -> None:
+            # new coins, so their spends match too. BLOOM_UPDATE_ALL adds them
+            # on the node as well, this keeps it right for other filters
+            keys, self.new_outpoints = self.new_outpoints, []
+            if keys:
+                raws = [outpoint_raw(key) for key in keys]
+                for raw in raws:
+                    bloom.add(raw)
+                await sio.call("add filter", raws)
+
+        async def block_connect(raw_entry: bytes, txs: List[bytes]) -> None:
+            entry = ChainEntry.from_raw(raw_entry)
+            decoded = [Transaction.from_raw(raw) for raw in txs]
+            self.connect_txs(entry.hash, entry.height, decoded)
+            await add_outpoints()
+
+        async def block_disconnect(raw_entry: bytes, *args: Any) -> None:
+            self.disconnect_block(ChainEntry.from_raw(raw_entry).hash)
+
+        async def tx(raw: bytes) -> None:
+            self.add_tx(Transaction.from_raw(raw))
+            await add_outpoints()
+
+        sio.on("block connect", block_connect)
+        sio.on("block disconnect", block_disconnect)
+        sio.on("tx", tx)